@@ -0,0 +1,109 @@
+import json
+import re
+
+import pandas as pd
+
+
+# --- Gemini Prompts ---
+# Prompt builders for the AI job profile and candidate summaries. Kept outside app.py so background
+# workers can build the exact same prompt (and therefore the same cache key) as the page does.
+
+def build_profile_prompt(role_name, job_level, role_purpose):
+    prompt = f"""
+    Act as a professional HR recruitment specialist. Based on the following job details, generate a concise and structured AI-Generated Job Profile.
+    The output must include exactly these three sections (use these headers exactly):
+    ### Job requirements
+    ### Job description
+    ### Key competencies
+    Formatting and tone rules:
+    - Write in short, specific bullet points or concise sentences (avoid long paragraphs).
+    - Use colon-based key-value style for skills (e.g., “SQL expertise: complex joins, window functions, performance tuning basics”).
+    - Keep each line direct and professional — avoid verbose sentences.
+    - Focus on technical and analytical skills (like SQL, Python/R, BI tools, data modeling, etc.).
+    - For Job description, limit to 2–3 concise sentences summarizing the role’s purpose and responsibilities.
+    - For Key competencies, list tools and technical proficiencies in a compact format (e.g., “SQL (Postgres/Snowflake/BigQuery), Git, DBT (nice), Airflow (nice)”).
+    - The tone must be clear, succinct, and skill-focused (no lengthy prose or generic HR language).
+    Job Details:
+    - Role Name: {role_name}
+    - Job Level: {job_level}
+    - Role Purpose: {role_purpose}
+    Generate the profile following this exact tone and structure — clear, succinct, and skill-focused (no lengthy prose or generic HR language).
+    """
+    return prompt
+
+
+def build_summary_prompt(candidate_info_tuple, tgv_scores_tuple, role_name):
+    # `candidate_info_tuple` is the ranked-list row as (column, value) pairs; `tgv_scores_tuple` the
+    # candidate's (tgv_name, tgv_match_rate) pairs sorted best first.
+    candidate_info = dict(candidate_info_tuple)
+    tgv_scores = pd.DataFrame(list(tgv_scores_tuple))
+    prompt = f"""
+    Act as a senior talent analyst. You are given data for a candidate being evaluated for the **{role_name}** role.
+    Provide a concise, data-driven summary (2-3 sentences) explaining why this candidate is a strong or weak fit.
+    Highlight their key strengths (top TGVs) and potential development areas (bottom TGVs) in relation to the role.
+    **Candidate Data:**
+    - **Name:** {candidate_info['fullname']}
+    - **Final Match Rate:** {candidate_info['final_match_rate']}%
+    - **Top 3 Strengths (TGV Scores):** {tgv_scores.head(3).to_dict('records')}
+    - **Top 3 Gaps (TGV Scores):** {tgv_scores.tail(3).to_dict('records')}
+    Generate the summary now.
+    """
+    return prompt
+
+
+def build_batch_summary_prompt(candidates, role_name):
+    # One prompt for several candidates; `candidates` is a list of (candidate_info_tuple, tgv_scores_tuple)
+    # as for build_summary_prompt. The model answers with a JSON object keyed by employee_id.
+    blocks = []
+    for candidate_info_tuple, tgv_scores_tuple in candidates:
+        candidate_info = dict(candidate_info_tuple)
+        tgv_scores = pd.DataFrame(list(tgv_scores_tuple))
+        blocks.append(f"""
+    **Candidate {candidate_info['employee_id']}:**
+    - **Name:** {candidate_info['fullname']}
+    - **Final Match Rate:** {candidate_info['final_match_rate']}%
+    - **Top 3 Strengths (TGV Scores):** {tgv_scores.head(3).to_dict('records')}
+    - **Top 3 Gaps (TGV Scores):** {tgv_scores.tail(3).to_dict('records')}""")
+    prompt = f"""
+    Act as a senior talent analyst. You are given data for {len(candidates)} candidates being evaluated for the **{role_name}** role.
+    For each candidate, provide a concise, data-driven summary (2-3 sentences) explaining why this candidate is a strong or weak fit.
+    Highlight their key strengths (top TGVs) and potential development areas (bottom TGVs) in relation to the role.
+    Evaluate each candidate on their own data only.
+    {''.join(blocks)}
+    Respond with a single JSON object mapping each candidate's ID (as a string) to their summary text, and nothing else.
+    """
+    return prompt
+
+
+def parse_batch_summaries(text, employee_ids):
+    # {employee_id: summary} from the model's answer to build_batch_summary_prompt. Tolerates a Markdown
+    # code fence around the JSON; IDs that are missing or not strings are left out.
+    match = re.search(r"\{.*\}", text, re.DOTALL)
+    if match is None:
+        raise ValueError("Batch summary response contains no JSON object")
+    data = json.loads(match.group(0))
+    summaries = {}
+    for employee_id in employee_ids:
+        summary = data.get(str(employee_id))
+        if isinstance(summary, str) and summary.strip():
+            summaries[employee_id] = summary.strip()
+    return summaries
+
+
+def build_template_summary(candidate_info_tuple, tgv_scores_tuple, percentile):
+    # A deterministic stand-in for the AI summary, built from the same inputs as build_summary_prompt
+    # plus the candidate's percentile (0-100) in the ranked list. Shown while the LLM is still working,
+    # or on its own when summary_mode = "template".
+    candidate_info = dict(candidate_info_tuple)
+    tgv_scores = [(name, rate) for name, rate in tgv_scores_tuple]
+    sentences = [
+        f"{candidate_info['fullname']} has a final match rate of {candidate_info['final_match_rate']:.1f}%, "
+        f"ahead of {percentile:.0f}% of the candidates in this analysis."
+    ]
+    if tgv_scores:
+        strengths = ', '.join(f"{name} ({rate:.1f}%)" for name, rate in tgv_scores[:3])
+        sentences.append(f"Strongest areas: {strengths}.")
+    if len(tgv_scores) > 3:
+        gaps = ', '.join(f"{name} ({rate:.1f}%)" for name, rate in reversed(tgv_scores[max(3, len(tgv_scores) - 3):]))
+        sentences.append(f"Main development areas: {gaps}.")
+    return ' '.join(sentences)
@@ -0,0 +1,161 @@
+import numpy as np
+import pandas as pd
+
+
+# --- Analysis Results ---
+# Built once per analysis so the candidate dashboard can look candidates up by employee_id without
+# scanning the ranked list or the TGV table on every rerun. TGV rows are sorted once by employee_id and
+# then by match rate (best first), and each employee maps to the [start, stop) slice of their rows.
+
+def _slices(employee_ids):
+    # {employee_id: (start, stop)} for an array sorted by employee_id.
+    if len(employee_ids) == 0:
+        return {}
+    starts = np.flatnonzero(np.r_[True, employee_ids[1:] != employee_ids[:-1]])
+    stops = np.r_[starts[1:], len(employee_ids)]
+    return {employee_ids[start]: (start, stop) for start, stop in zip(starts, stops)}
+
+
+def benchmark_profile(tgv_df, tv_df, benchmark_ids):
+    # The benchmark's average rate per TGV (the "Benchmark Avg" radar trace) and its baseline value per TV,
+    # from any match results that include the benchmark employees.
+    benchmark_tgv = tgv_df[tgv_df['employee_id'].isin(benchmark_ids)]
+    tgv_profile = benchmark_tgv.groupby('tgv_name', observed=True)['tgv_match_rate'].mean().reset_index()
+    benchmark_tv = tv_df[tv_df['employee_id'].isin(benchmark_ids)]
+    baseline_tv = (benchmark_tv[['tgv_name', 'tv_name', 'source', 'baseline_score']]
+                   .drop_duplicates(['tgv_name', 'tv_name'])
+                   .sort_values(['tgv_name', 'tv_name'])
+                   .reset_index(drop=True))
+    return tgv_profile, baseline_tv
+
+
+class AnalysisResults:
+    # Also carries what every dashboard rerun needs from the benchmark: the TGV profile, the baseline TV
+    # values, and the distribution of final match rates (sorted, for O(log n) percentiles).
+    def __init__(self, ranked_list, tgv_df=None, benchmark_tgv_profile=None, baseline_tv=None):
+        # `tgv_df` holds employee x TGV rates for every ranked employee; None when they are fetched per
+        # candidate (ranked_list_source = "sql"), in which case add_tgv_scores() fills the index lazily.
+        self.ranked_list = ranked_list
+        self.benchmark_tgv_profile = benchmark_tgv_profile
+        self.baseline_tv = baseline_tv
+        rates = ranked_list['final_match_rate'].to_numpy(dtype=float)
+        self._sorted_rates = np.sort(rates[~np.isnan(rates)])
+        self.distribution = self._distribution_stats()
+        self.employee_ids = ranked_list['employee_id'].to_numpy(dtype=object)
+        self._rows = {employee_id: i for i, employee_id in enumerate(self.employee_ids)}
+        # Candidate picker labels ("ID - Name") in ranked order, and their lower-cased form for search.
+        self.labels = [f"{employee_id} - {name}" for employee_id, name in zip(self.employee_ids, ranked_list['fullname'])]
+        self._search_text = pd.Series(self.labels, dtype=object).str.lower()
+        self._filter_codes = {}
+        self._sort_orders = {}
+        self._tgv_names = np.array([], dtype=object)
+        self._tgv_rates = np.array([], dtype=float)
+        self._tgv_slices = {}
+        if tgv_df is not None:
+            self.add_tgv_scores(tgv_df)
+
+    def _distribution_stats(self):
+        rates = self._sorted_rates
+        if len(rates) == 0:
+            return {'count': 0}
+        return {
+            'count': len(rates),
+            'mean': float(rates.mean()),
+            'median': float(np.median(rates)),
+            'p25': float(np.percentile(rates, 25)),
+            'p75': float(np.percentile(rates, 75)),
+            'min': float(rates[0]),
+            'max': float(rates[-1]),
+        }
+
+    def percentile(self, final_match_rate):
+        # Share of candidates (0-100) with a lower final match rate.
+        if len(self._sorted_rates) == 0:
+            return 0.0
+        return float(np.searchsorted(self._sorted_rates, final_match_rate, side='left') / len(self._sorted_rates) * 100)
+
+    def add_tgv_scores(self, tgv_df):
+        # Indexes the TGV rates of the employees in `tgv_df` (replacing any earlier entries for them).
+        employee_ids = tgv_df['employee_id'].to_numpy(dtype=object)
+        rates = tgv_df['tgv_match_rate'].to_numpy(dtype=float)
+        # Stable sort: by employee, best rate first, ties in their original order.
+        codes, _ = pd.factorize(employee_ids, sort=True)
+        order = np.lexsort((-rates, codes))
+        offset = len(self._tgv_names)
+        self._tgv_names = np.concatenate([self._tgv_names, tgv_df['tgv_name'].to_numpy(dtype=object)[order]])
+        self._tgv_rates = np.concatenate([self._tgv_rates, rates[order]])
+        for employee_id, (start, stop) in _slices(employee_ids[order]).items():
+            self._tgv_slices[employee_id] = (offset + start, offset + stop)
+
+    def __contains__(self, employee_id):
+        return employee_id in self._rows
+
+    def has_tgv_scores(self, employee_id):
+        return employee_id in self._tgv_slices
+
+    def label(self, employee_id):
+        return self.labels[self._rows[employee_id]]
+
+    def search(self, query):
+        # Positions (in ranked order) of the candidates whose ID or name contains `query`, ignoring case.
+        query = (query or '').strip().lower()
+        if not query:
+            return np.arange(len(self.labels))
+        return np.flatnonzero(self._search_text.str.contains(query, regex=False).to_numpy())
+
+    def position(self, employee_id):
+        # The employee's position in the ranked list.
+        return self._rows[employee_id]
+
+    def _codes(self, column):
+        # (codes, sorted values) of a label column, factorized once; missing values get code -1.
+        if column not in self._filter_codes:
+            values = self.ranked_list[column].to_numpy(dtype=object)
+            self._filter_codes[column] = pd.factorize(values, sort=True)
+        return self._filter_codes[column]
+
+    def filter_options(self, column):
+        return list(self._codes(column)[1])
+
+    def _sort_order(self, column, ascending):
+        # Stable ordering of all rows by a column, computed once per column and direction; missing last.
+        key = (column, ascending)
+        if key not in self._sort_orders:
+            values = self.ranked_list[column]
+            if pd.api.types.is_numeric_dtype(values):
+                sort_key = values.to_numpy(dtype=float)
+            else:
+                codes = self._codes(column)[0]
+                sort_key = np.where(codes < 0, np.nan, codes.astype(float))
+            self._sort_orders[key] = np.argsort(sort_key if ascending else -sort_key, kind='stable')
+        return self._sort_orders[key]
+
+    def query(self, filters=None, search='', sort_by=None, ascending=True):
+        # Positions of the rows that pass `filters` ({column: allowed values}, empty lists ignored) and the
+        # ID/name `search`, in `sort_by` order (ranked order when None).
+        keep = np.zeros(len(self.labels), dtype=bool)
+        keep[self.search(search)] = True
+        for column, allowed in (filters or {}).items():
+            if allowed:
+                codes, values = self._codes(column)
+                allowed_codes = np.flatnonzero(np.isin(values, list(allowed)))
+                keep &= np.isin(codes, allowed_codes)
+        order = self._sort_order(sort_by, ascending) if sort_by else np.arange(len(self.labels))
+        return order[keep[order]]
+
+    def rows(self, positions):
+        return self.ranked_list.iloc[positions]
+
+    def candidate(self, employee_id):
+        # The employee's ranked-list row.
+        return self.ranked_list.iloc[self._rows[employee_id]]
+
+    def tgv_arrays(self, employee_id):
+        # (tgv_names, tgv_match_rates) of one employee, best first; views into the shared arrays.
+        start, stop = self._tgv_slices.get(employee_id, (0, 0))
+        return self._tgv_names[start:stop], self._tgv_rates[start:stop]
+
+    def tgv_scores(self, employee_id):
+        # The employee's TGV rates as a DataFrame (tgv_name, tgv_match_rate), best first.
+        names, rates = self.tgv_arrays(employee_id)
+        return pd.DataFrame({'tgv_name': names, 'tgv_match_rate': rates})
@@ -3,7 +3,21 @@ import pandas as pd
 import psycopg2
 import plotly.express as px
 import plotly.graph_objects as go
-import google.generativeai as genai
+
+from ai_prompts import (build_batch_summary_prompt, build_profile_prompt, build_summary_prompt, build_template_summary,
+                        parse_batch_summaries)
+from analysis_results import AnalysisResults, benchmark_profile
+from benchmark_key import benchmark_key, canonicalize_benchmark_ids
+from db import ConnectionPool
+from llm_cache import MemoryCache, SQLiteCache, prompt_key
+from llm_client import LLMClient
+from llm_providers import CassetteProvider, GeminiProvider, StubProvider
+from matching_engine import TalentArrays, load_talent_arrays
+from profile_index import ProfileIndex
+from result_store import ResultStore
+from summary_prefetch import SummaryPrefetcher
+from talent_data import ensure_unified_talent_data, get_data_version
+from talent_queries import TALENT_TABLES, fetch_ranked_list, fetch_talent_tables, fetch_unified_rows
 
 # --- 1. App Configuration ---
 st.set_page_config(
@@ -13,100 +27,520 @@ st.set_page_config(
 )
 
 # --- 2. API & State Initialization ---
+GEMINI_MODEL = 'gemini-2.5-flash'
+
+@st.cache_resource
+def get_llm_provider():
+    # llm_provider selects the backend: "gemini" (default), "stub" (offline, deterministic) or
+    # "cassette" (record Gemini responses to a file, or replay them offline).
+    provider = st.secrets.get("llm_provider", "gemini")
+    if provider == "stub":
+        return StubProvider(
+            latency=float(st.secrets.get("stub_latency_seconds", 0.5)),
+            chunk_delay=float(st.secrets.get("stub_chunk_delay_seconds", 0.02)),
+            outputs=dict(st.secrets.get("stub_outputs", {}))
+        )
+    if provider not in ("gemini", "cassette"):
+        raise ValueError(f"Unknown llm_provider: {provider!r}")
+    cassette_mode = st.secrets.get("llm_cassette_mode", "replay")
+    gemini = None
+    if provider == "gemini" or cassette_mode == "record":
+        # gemini_api_endpoint (optional) points the client at another host, e.g. a local stub server.
+        gemini = GeminiProvider(GEMINI_MODEL, st.secrets["google_api_key"], st.secrets.get("gemini_api_endpoint"))
+    if provider == "cassette":
+        return CassetteProvider(
+            st.secrets.get("llm_cassette_path", ".cache/llm_cassette.jsonl"),
+            mode=cassette_mode, inner=gemini, model_name=GEMINI_MODEL
+        )
+    return gemini
+
 try:
-    genai.configure(api_key=st.secrets["google_api_key"])
+    get_llm_provider()
 except (KeyError, AttributeError):
     st.error("⚠️ Google API Key not found. Please add it to your Streamlit secrets.")
     st.stop()
+except (FileNotFoundError, ValueError) as e:
+    st.error(f"⚠️ Could not set up the AI provider: {e}")
+    st.stop()
 
 # Initialize session state to persist data across reruns
 if 'analysis_run' not in st.session_state:
     st.session_state.analysis_run = False
-if 'main_df' not in st.session_state:
-    st.session_state.main_df = pd.DataFrame()
+if 'talent_tables' not in st.session_state:
+    st.session_state.talent_tables = {}
 if 'ranked_list' not in st.session_state:
     st.session_state.ranked_list = pd.DataFrame()
+if 'analysis_results' not in st.session_state:
+    st.session_state.analysis_results = None
 
 
 # --- 3. Core Functions (with Caching for Performance) ---
 
 @st.cache_resource
-def get_db_connection():
-    # Connects to the Supabase PostgreSQL database using credentials from secrets.
+def get_db_pool():
+    # Creates one connection pool to the Supabase PostgreSQL database, shared by all sessions.
     try:
-        conn = psycopg2.connect(
+        return ConnectionPool(
+            minconn=int(st.secrets.get("db_pool_min", 1)),
+            maxconn=int(st.secrets.get("db_pool_max", 10)),
             host=st.secrets["db_host"],
             database=st.secrets["db_name"],
             user=st.secrets["db_user"],
             password=st.secrets["db_password"],
             port=st.secrets["db_port"]
         )
-        return conn
     except psycopg2.OperationalError as e:
         st.error(f"Error connecting to database: {e}")
         st.stop()
 
+@st.cache_resource(ttl=3600, max_entries=1)
+def get_talent_arrays(data_version):
+    # Loads UnifiedTalentData once into the in-memory matching engine (shared by all sessions).
+    # Keyed on the data version, so a refresh reloads it; only the latest version is kept in memory.
+    return get_db_pool().run(load_talent_arrays)
+
+@st.cache_resource
+def get_result_store():
+    # On-disk Parquet cache of matching results, shared across restarts and app processes.
+    return ResultStore(
+        st.secrets.get("result_cache_dir", ".cache/results"),
+        max_bytes=int(st.secrets.get("result_cache_max_mb", 512)) * 1024 * 1024
+    )
+
+@st.cache_resource
+def ensure_talent_data():
+    # Creates the unified_talent_data materialized view if this database doesn't have it yet.
+    get_db_pool().run(ensure_unified_talent_data)
+    return True
+
+@st.cache_data(ttl=60, show_spinner=False)
+def get_current_data_version():
+    # Re-checked at most once a minute; a new version makes every persistent cache entry stale.
+    ensure_talent_data()
+    return get_db_pool().run(get_data_version)
+
+# Functions below are cached on `bench_key` (see benchmark_key.py) and `data_version`; the underscore-prefixed
+# arguments are excluded from Streamlit's hashing, so "A,B" and "b, a" share one cache entry.
+@st.cache_data(ttl=600)
+def get_benchmark_members(bench_key, data_version, _benchmark_ids):
+    # The benchmark employees' IDs as stored, matched case-insensitively against the canonical IDs.
+    def resolve(conn):
+        with conn.cursor() as cur:
+            cur.execute("SELECT employee_id FROM employees WHERE UPPER(employee_id) IN %s ORDER BY employee_id",
+                        (tuple(_benchmark_ids),))
+            return tuple(row[0] for row in cur.fetchall())
+    return get_db_pool().run(resolve)
+
 @st.cache_data(ttl=600)
-def run_talent_query(_conn, benchmark_ids_tuple):
-    # Reads the external SQL file and executes the query.
-    with open('query.sql', 'r') as f:
-        sql_query = f.read()
-    df = pd.read_sql_query(sql_query, _conn, params=(benchmark_ids_tuple,))
-    return df
-
-@st.cache_data
-def generate_ai_profile(role_name, job_level, role_purpose):
-    # Generates the job profile using the Gemini API. Cached to prevent re-running.
-    model = genai.GenerativeModel('gemini-2.5-flash')
-    prompt = f"""
-    Act as a professional HR recruitment specialist. Based on the following job details, generate a concise and structured AI-Generated Job Profile.
-    The output must include exactly these three sections (use these headers exactly):
-    ### Job requirements
-    ### Job description
-    ### Key competencies
-    Formatting and tone rules:
-    - Write in short, specific bullet points or concise sentences (avoid long paragraphs).
-    - Use colon-based key-value style for skills (e.g., “SQL expertise: complex joins, window functions, performance tuning basics”).
-    - Keep each line direct and professional — avoid verbose sentences.
-    - Focus on technical and analytical skills (like SQL, Python/R, BI tools, data modeling, etc.).
-    - For Job description, limit to 2–3 concise sentences summarizing the role’s purpose and responsibilities.
-    - For Key competencies, list tools and technical proficiencies in a compact format (e.g., “SQL (Postgres/Snowflake/BigQuery), Git, DBT (nice), Airflow (nice)”).
-    - The tone must be clear, succinct, and skill-focused (no lengthy prose or generic HR language).
-    Job Details:
-    - Role Name: {role_name}
-    - Job Level: {job_level}
-    - Role Purpose: {role_purpose}
-    Generate the profile following this exact tone and structure — clear, succinct, and skill-focused (no lengthy prose or generic HR language).
-    """
+def run_talent_query(bench_key, data_version, _benchmark_ids):
+    # Returns the match results as the three TALENT_TABLES relations: 'employees' (final rate),
+    # 'tgv' (employee x TGV) and 'tv' (employee x TV).
+    # Serves them from the on-disk store when this benchmark set was already scored against the
+    # current data. Otherwise scores it with the configured engine: "sql" runs the external SQL file on
+    # a pooled connection (fetched via COPY into Arrow), "numpy" re-scores the cached in-memory arrays
+    # without a database round trip.
+    store = get_result_store()
+    tables = {name: store.get(f'talent-{name}', bench_key, data_version) for name in TALENT_TABLES}
+    if all(df is not None for df in tables.values()):
+        return tables
+    if st.secrets.get("matching_engine", "sql") == "numpy":
+        tables = get_talent_arrays(data_version).score_tables(_benchmark_ids)
+    else:
+        tables = get_db_pool().run(lambda conn: fetch_talent_tables(conn, _benchmark_ids))
+    for name, df in tables.items():
+        store.put(f'talent-{name}', bench_key, data_version, df)
+    return tables
+
+@st.cache_data(ttl=600)
+def run_ranked_list_query(bench_key, data_version, _benchmark_ids):
+    # Ranked list computed in the database (see talent_queries.fetch_ranked_list), so only one row
+    # per employee is transferred. Persisted in the on-disk store like the full results.
+    store = get_result_store()
+    ranked_list = store.get('ranked-list', bench_key, data_version)
+    if ranked_list is None:
+        ranked_list = get_db_pool().run(lambda conn: fetch_ranked_list(conn, _benchmark_ids))
+        store.put('ranked-list', bench_key, data_version, ranked_list)
+    return ranked_list
+
+def use_sql_ranked_list():
+    # "sql" runs the analysis in two tiers: the ranked list is built in the database, and each candidate's
+    # TGV/TV scores are fetched only when they are opened in the dashboard. "python" (default) fetches
+    # the full results up front. The numpy engine always uses "python".
+    return (st.secrets.get("ranked_list_source", "python") == "sql"
+            and st.secrets.get("matching_engine", "sql") == "sql")
+
+def get_talent_tables():
+    # Full match results of the current analysis, fetched on first use.
+    if not st.session_state.talent_tables:
+        st.session_state.talent_tables = run_talent_query(
+            st.session_state.bench_key, st.session_state.data_version, st.session_state.benchmark_ids)
+    return st.session_state.talent_tables
+
+@st.cache_data(ttl=600)
+def get_benchmark_tables(bench_key, data_version, _benchmark_ids):
+    # Tier 1 of the "sql" mode: the benchmark employees' talent rows, from which the baseline is built.
+    # Returns the inputs of TalentArrays plus the benchmark employees' own scores.
+    unified_df, employees_df = get_db_pool().run(lambda conn: fetch_unified_rows(conn, _benchmark_ids))
+    tables = TalentArrays(unified_df, employees_df).score_tables(_benchmark_ids)
+    return unified_df, employees_df, tables
+
+@st.cache_data(ttl=600)
+def get_candidate_tables(bench_key, data_version, employee_ids, _benchmark_ids):
+    # Tier 2 of the "sql" mode: the given candidates' rows, scored against the same benchmark baseline with
+    # the in-memory engine (a candidate's rates depend only on their own rows and the baseline).
+    bench_unified, bench_employees, bench_tables = get_benchmark_tables(bench_key, data_version, _benchmark_ids)
+    others = tuple(e for e in employee_ids if e not in _benchmark_ids)
+    if not others:
+        tables = bench_tables
+    else:
+        unified_df, employees_df = get_db_pool().run(lambda conn: fetch_unified_rows(conn, others))
+        arrays = TalentArrays(pd.concat([bench_unified, unified_df]), pd.concat([bench_employees, employees_df]))
+        tables = arrays.score_tables(_benchmark_ids)
+    return {name: df[df['employee_id'].isin(employee_ids)].reset_index(drop=True) for name, df in tables.items()}
+
+def build_analysis_results(ranked_list):
+    # Per-analysis lookup structure for the dashboard, including the benchmark profile and distribution
+    # stats. With the full results loaded every candidate's TGV rates are indexed up front; in "sql" mode
+    # they are added as candidates are fetched.
+    benchmark_ids = st.session_state.benchmark_ids
+    if use_sql_ranked_list():
+        tables = get_benchmark_tables(st.session_state.bench_key, st.session_state.data_version, benchmark_ids)[2]
+        tgv_df = None
+    else:
+        tables = get_talent_tables()
+        tgv_df = tables['tgv']
+    tgv_profile, baseline_tv = benchmark_profile(tables['tgv'], tables['tv'], benchmark_ids)
+    return AnalysisResults(ranked_list, tgv_df, benchmark_tgv_profile=tgv_profile, baseline_tv=baseline_tv)
+
+def load_candidates_tgv_scores(employee_ids):
+    # Makes sure the given candidates' TGV rates are in the analysis results (only "sql" mode fetches).
+    results = st.session_state.analysis_results
+    missing = tuple(e for e in employee_ids if not results.has_tgv_scores(e))
+    if missing and use_sql_ranked_list():
+        results.add_tgv_scores(get_candidate_tables(st.session_state.bench_key, st.session_state.data_version,
+                                                    missing, st.session_state.benchmark_ids)['tgv'])
+    return results
+
+def get_candidate_tgv_scores(employee_id):
+    # (tgv_name, tgv_match_rate) of one candidate, best first.
+    return load_candidates_tgv_scores((employee_id,)).tgv_scores(employee_id)
+
+@st.cache_data(ttl=600)
+def build_ranked_list(bench_key, data_version, _tables):
+    # One row per employee, enriched with their top TGV and top strengths.
+    base_ranked_list = _tables['employees'][['employee_id', 'fullname', 'directorate', 'role', 'grade', 'final_match_rate']]
+    tgv_scores_df = _tables['tgv']
+    # Ties go to the first TGV name, as in fetch_ranked_list.
+    top_tgv = (tgv_scores_df.astype({'tgv_name': str})
+               .sort_values(['employee_id', 'tgv_match_rate', 'tgv_name'], ascending=[True, False, True])
+               .drop_duplicates('employee_id'))
+    top_tgv = top_tgv.rename(columns={'tgv_name': 'top_tgv'}).drop(columns='tgv_match_rate')
+    tv_df = _tables['tv']
+    # Strengths in the employee's own CliftonStrengths rank order (same order as fetch_ranked_list).
+    strengths_df = tv_df.loc[tv_df['source'] == 'strengths', ['employee_id', 'tv_name', 'tv_rank']].astype({'tv_name': str})
+    strengths_df = strengths_df.sort_values(['tv_rank', 'tv_name'])
+    agg_strengths = strengths_df.groupby('employee_id')['tv_name'].apply(lambda x: ', '.join(x.head(3))).reset_index()
+    agg_strengths = agg_strengths.rename(columns={'tv_name': 'top_strengths'})
+    ranked_list_final = pd.merge(base_ranked_list, top_tgv, on='employee_id', how='left')
+    ranked_list_final = pd.merge(ranked_list_final, agg_strengths, on='employee_id', how='left')
+    return ranked_list_final.sort_values('final_match_rate', ascending=False).reset_index(drop=True)
+
+@st.cache_data(ttl=600)
+def build_distribution_chart(bench_key, data_version, _ranked_list):
+    # Histogram of final match rates; the selected-candidate marker is added per rerun on a copy.
+    return px.histogram(_ranked_list, x="final_match_rate", nbins=20, title="Distribution Across All Candidates")
+
+@st.cache_resource
+def get_llm_client():
+    # Process-wide client for the configured provider: rate limited, retried on transient errors,
+    # identical prompts coalesced. Safe to use from background threads.
+    provider = get_llm_provider()
+    return LLMClient(
+        provider.generate, provider.stream,
+        rate_per_minute=float(st.secrets.get("llm_rate_per_minute", 60)),
+        burst=int(st.secrets.get("llm_burst", 5)),
+        max_retries=int(st.secrets.get("llm_max_retries", 3))
+    )
+
+@st.cache_resource
+def get_llm_cache():
+    # Generated texts (job profiles and summaries). By default a SQLite file shared by every app process
+    # and kept across restarts; llm_cache_path = "" falls back to an in-process cache.
+    path = st.secrets.get("llm_cache_path", ".cache/llm.sqlite3")
+    if not path:
+        return MemoryCache(max_entries=2000)
+    return SQLiteCache(
+        path,
+        ttl_seconds=float(st.secrets.get("llm_cache_ttl_days", 30)) * 24 * 3600,
+        max_bytes=int(st.secrets.get("llm_cache_max_mb", 64)) * 1024 * 1024
+    )
+
+@st.cache_resource
+def get_summary_prefetcher():
+    # The shared cache of generated texts plus the bounded thread pool that fills it ahead of time.
+    return SummaryPrefetcher(
+        get_llm_cache(),
+        max_workers=int(st.secrets.get("summary_prefetch_workers", 4)),
+        max_pending=int(st.secrets.get("summary_prefetch_max_pending", 32))
+    )
+
+@st.cache_resource
+def get_profile_prefetcher():
+    # Job profiles get their own small pool, so a results page never waits on a profile queued behind
+    # other sessions' summary jobs.
+    return SummaryPrefetcher(
+        get_llm_cache(),
+        max_workers=int(st.secrets.get("profile_prefetch_workers", 2)),
+        max_pending=int(st.secrets.get("profile_prefetch_max_pending", 8))
+    )
+
+def llm_key(prompt):
+    # Cache key of a generated text: the provider's model name plus the prompt.
+    return prompt_key(get_llm_provider().model_name, prompt)
+
+def generate_text(prompt, render=None, prefetcher=None):
+    # Returns the cached text for the prompt (waiting for a background job of `prefetcher`, the summary
+    # pool by default, if one is running for it). Otherwise calls the LLM; with `render` and llm_streaming
+    # on (default), the response is streamed into render(text_so_far) as it arrives. Only complete
+    # responses are cached; errors propagate.
+    prefetcher = prefetcher or get_summary_prefetcher()
+    key = llm_key(prompt)
+    text = prefetcher.peek(key)
+    if text is None:
+        if render is not None and st.secrets.get("llm_streaming", True):
+            text = ""
+            for chunk in get_llm_client().stream(prompt):
+                text += chunk
+                render(text + " ▌")
+        else:
+            text = get_llm_client().generate(prompt)
+        prefetcher.cache.set(key, text)
+    if render is not None:
+        render(text)
+    return text
+
+@st.cache_resource
+def get_profile_index():
+    # Earlier job profiles for the same role name and job level, looked up by similarity of the role purpose.
+    # profile_similarity_threshold = 1.0 only reuses profiles whose inputs differ in case, spacing or punctuation.
+    path = st.secrets.get("profile_index_path", ".cache/profile_index.jsonl")
+    return ProfileIndex(path or None, threshold=float(st.secrets.get("profile_similarity_threshold", 0.85)))
+
+def find_similar_profile(role_name, job_level, role_purpose):
+    # The text of the matching earlier profile, or None (also when it has expired from the LLM cache).
+    match = get_profile_index().find(get_llm_provider().model_name, role_name, job_level, role_purpose)
+    return get_llm_cache().get(match[0]) if match else None
+
+def generate_ai_profile(role_name, job_level, role_purpose, render=None):
+    # Generates the job profile using the Gemini API. Cached to prevent re-running; a profile generated
+    # earlier for a near-identical request is reused without calling the LLM.
     try:
-        response = model.generate_content(prompt)
-        return response.text
+        text = find_similar_profile(role_name, job_level, role_purpose)
+        if text is not None:
+            if render is not None:
+                render(text)
+            return text
+        prompt = build_profile_prompt(role_name, job_level, role_purpose)
+        text = generate_text(prompt, render, get_profile_prefetcher())
+        get_profile_index().add(get_llm_provider().model_name, role_name, job_level, role_purpose, llm_key(prompt))
+        return text
     except Exception as e:
-        return f"Error generating AI profile: {e}"
-
-@st.cache_data
-def generate_ai_summary(candidate_info_tuple, tgv_scores_tuple, role_name):
-    # Generates a candidate summary using the Gemini API. Cached for performance.
-    candidate_info = dict(candidate_info_tuple)
-    tgv_scores = pd.DataFrame(list(tgv_scores_tuple))
-
-    model = genai.GenerativeModel('gemini-2.5-flash')
-    prompt = f"""
-    Act as a senior talent analyst. You are given data for a candidate being evaluated for the **{role_name}** role.
-    Provide a concise, data-driven summary (2-3 sentences) explaining why this candidate is a strong or weak fit.
-    Highlight their key strengths (top TGVs) and potential development areas (bottom TGVs) in relation to the role.
-    **Candidate Data:**
-    - **Name:** {candidate_info['fullname']}
-    - **Final Match Rate:** {candidate_info['final_match_rate']}%
-    - **Top 3 Strengths (TGV Scores):** {tgv_scores.head(3).to_dict('records')}
-    - **Top 3 Gaps (TGV Scores):** {tgv_scores.tail(3).to_dict('records')}
-    Generate the summary now.
-    """
+        text = f"Error generating AI profile: {e}"
+        if render is not None:
+            render(text)
+        return text
+
+def prefetch_ai_profile(role_name, job_level, role_purpose):
+    # Starts the job profile on its background pool so it is generated while the matching query runs;
+    # the results page then picks it up (or waits for it) through generate_ai_profile, which indexes it.
+    match = get_profile_index().find(get_llm_provider().model_name, role_name, job_level, role_purpose)
+    if match is not None and get_llm_cache().contains(match[0]):
+        return
+    prompt = build_profile_prompt(role_name, job_level, role_purpose)
+    client = get_llm_client()
+    get_profile_prefetcher().submit(llm_key(prompt), lambda: client.generate(prompt))
+
+def build_summary_args(candidate_info, candidate_tgv_scores):
+    # Hashable arguments for generate_ai_summary from a ranked-list row and the candidate's TGV scores
+    # (already sorted best first, see AnalysisResults).
+    candidate_info_tuple = tuple(candidate_info.to_dict().items())
+    tgv_scores_tuple = tuple(map(tuple, candidate_tgv_scores[['tgv_name', 'tgv_match_rate']].to_numpy()))
+    return candidate_info_tuple, tgv_scores_tuple
+
+def generate_ai_summary(candidate_info_tuple, tgv_scores_tuple, role_name, render=None):
+    # Generates a candidate summary using the Gemini API. Served from the shared cache, or from the
+    # background prefetch job if one is still running for this candidate. Errors are not cached.
     try:
-        response = model.generate_content(prompt)
-        return response.text
+        return generate_text(build_summary_prompt(candidate_info_tuple, tgv_scores_tuple, role_name), render)
     except Exception as e:
-        return f"Error generating AI summary: {e}"
+        text = f"Error generating AI summary: {e}"
+        if render is not None:
+            render(text)
+        return text
+
+def use_llm_summaries():
+    # summary_mode = "template" skips the LLM for candidate summaries and only shows the local summary.
+    return st.secrets.get("summary_mode", "llm") != "template"
+
+def generate_summary_batch(client, batch, role_name):
+    # One Gemini request for several candidates. `batch` is a list of (employee_id, cache key, summary args);
+    # returns {cache key: summary} so each summary lands in the cache under its single-candidate prompt key.
+    prompt = build_batch_summary_prompt([args for _, _, args in batch], role_name)
+    text = client.generate(prompt, generation_config={"response_mime_type": "application/json"})
+    summaries = parse_batch_summaries(text, [employee_id for employee_id, _, _ in batch])
+    return {key: summaries[employee_id] for employee_id, key, _ in batch if employee_id in summaries}
+
+def prefetch_ai_summaries(ranked_list, role_name):
+    # Queues background summaries for the top-K candidates of a fresh ranked list, summary_batch_size
+    # candidates per Gemini request (1 sends the regular single-candidate prompt).
+    top_candidates = ranked_list.head(int(st.secrets.get("summary_prefetch_top_k", 10)))
+    if top_candidates.empty:
+        return
+    results = load_candidates_tgv_scores(tuple(top_candidates['employee_id']))
+    prefetcher = get_summary_prefetcher()
+    client = get_llm_client()
+    batch_size = max(1, int(st.secrets.get("summary_batch_size", 5)))
+    pending = []
+    for i in range(len(top_candidates)):
+        candidate_info = top_candidates.iloc[i]
+        args = build_summary_args(candidate_info, results.tgv_scores(candidate_info['employee_id']))
+        prompt = build_summary_prompt(*args, role_name)
+        key = llm_key(prompt)
+        if batch_size == 1:
+            prefetcher.submit(key, lambda prompt=prompt: client.generate(prompt))
+        elif not prefetcher.cache.contains(key):
+            pending.append((candidate_info['employee_id'], key, args))
+    for start in range(0, len(pending), batch_size):
+        batch = pending[start:start + batch_size]
+        prefetcher.submit_batch([key for _, key, _ in batch], lambda batch=batch: generate_summary_batch(client, batch, role_name))
+
+
+RANKED_LIST_SORT_COLUMNS = {
+    'final_match_rate': "Final match rate", 'fullname': "Name", 'employee_id': "Employee ID",
+    'directorate': "Directorate", 'role': "Role", 'grade': "Grade",
+}
+
+@st.fragment
+def ranked_list_grid(results):
+    # Section 2 runs as a fragment. Filtering, search, sorting and paging happen here on the indexed
+    # AnalysisResults, and only the visible page is sent to the browser. Clicking a row opens that
+    # candidate in the dashboard below.
+    filter_cols = st.columns(3)
+    filters = {}
+    for col, (column, label) in zip(filter_cols, [('directorate', "Directorate"), ('role', "Role"), ('grade', "Grade")]):
+        with col:
+            filters[column] = st.multiselect(label, results.filter_options(column), key=f"grid_filter_{column}")
+    search_col, sort_col, order_col, size_col = st.columns([3, 2, 1, 1])
+    with search_col:
+        search = st.text_input("Search by ID or name:", key="grid_search")
+    with sort_col:
+        sort_by = st.selectbox("Sort by", list(RANKED_LIST_SORT_COLUMNS), format_func=RANKED_LIST_SORT_COLUMNS.get, key="grid_sort_by")
+    with order_col:
+        ascending = st.selectbox("Order", [False, True], format_func=lambda x: "Ascending" if x else "Descending", key="grid_ascending")
+    with size_col:
+        page_size = st.selectbox("Rows per page", [25, 50, 100], key="grid_page_size")
+
+    positions = results.query(filters, search, sort_by, ascending)
+    page_count = max(1, -(-len(positions) // page_size))
+    page = st.selectbox(f"Page (of {page_count}, {len(positions)} candidates)", range(1, page_count + 1), key="grid_page")
+    page_rows = results.rows(positions[(page - 1) * page_size:page * page_size])
+    # A new key per view, so a row selected on one page or filter doesn't carry over to the next. The
+    # key also changes after each handled click, which clears the selection so the same row can be clicked
+    # again once another candidate was picked below.
+    view = hash((tuple(tuple(v) for v in filters.values()), search, sort_by, ascending, page_size, page,
+                 st.session_state.get('grid_clicks', 0)))
+    event = st.dataframe(page_rows, use_container_width=True, hide_index=True,
+                         on_select="rerun", selection_mode="single-row", key=f"grid_table_{view}")
+
+    selected_rows = event.selection.rows
+    clicked = page_rows['employee_id'].iloc[selected_rows[0]] if selected_rows else None
+    if clicked is not None and clicked != st.session_state.get('candidate_select'):
+        st.session_state.grid_clicks = st.session_state.get('grid_clicks', 0) + 1
+        st.session_state.picked_employee_id = clicked
+        st.rerun()
+
+def candidate_picker(results):
+    # Search box plus a paginated selectbox: only one page of options (labels precomputed in
+    # AnalysisResults) is sent to the browser per rerun. Returns the selected employee_id or None.
+    page_size = int(st.secrets.get("candidate_picker_page_size", 50))
+    # A row clicked in the ranked list is preselected: clear the search and jump to its page.
+    picked = st.session_state.pop('picked_employee_id', None)
+    if picked is not None and picked in results:
+        st.session_state.candidate_search = ""
+        st.session_state.candidate_page = results.position(picked) // page_size + 1
+        st.session_state.candidate_select = picked
+    search_col, page_col = st.columns([3, 1])
+    with search_col:
+        query = st.text_input("Search candidates by ID or name:", key="candidate_search")
+    matches = results.search(query)
+    page_count = max(1, -(-len(matches) // page_size))
+    with page_col:
+        page = st.selectbox(f"Page (of {page_count})", range(1, page_count + 1), key="candidate_page")
+    if len(matches) == 0:
+        st.info("No candidates match your search.")
+        return None
+    options = results.employee_ids[matches[(page - 1) * page_size:page * page_size]]
+    return st.selectbox("Select a candidate to analyze:", options=options, format_func=results.label, key="candidate_select")
+
+
+@st.fragment
+def candidate_dashboard(role_name):
+    # Section 3 runs as a fragment: choosing another candidate reruns only this function, so the AI
+    # profile and the ranked list above are neither recomputed nor sent to the browser again.
+    results = st.session_state.analysis_results
+    selected_employee_id = candidate_picker(results)
+    if not selected_employee_id:
+        return
+
+    candidate_tgv_scores = get_candidate_tgv_scores(selected_employee_id)
+    candidate_info = results.candidate(selected_employee_id)
+
+    # Prepare arguments for cached AI summary function
+    candidate_info_tuple, tgv_scores_tuple = build_summary_args(candidate_info, candidate_tgv_scores)
+
+    # The local summary shows up at once; the AI summary replaces it when it arrives.
+    ai_summary_placeholder = st.empty()
+    percentile = results.percentile(candidate_info['final_match_rate'])
+    template_summary = build_template_summary(candidate_info_tuple, tgv_scores_tuple, percentile)
+    if use_llm_summaries():
+        ai_summary_placeholder.info(f"**Quick Summary for {candidate_info['fullname']}** (AI summary loading...)\n\n{template_summary}")
+        generate_ai_summary(
+            candidate_info_tuple, tgv_scores_tuple, role_name,
+            render=lambda text: ai_summary_placeholder.info(f"**AI Analyst Summary for {candidate_info['fullname']}:**\n\n{text}")
+        )
+    else:
+        ai_summary_placeholder.info(f"**Summary for {candidate_info['fullname']}:**\n\n{template_summary}")
+
+    # Visualization columns
+    vis_col1, vis_col2 = st.columns(2)
+    with vis_col1:
+        st.subheader("TGV Profile vs. Benchmark")
+        radar_df = pd.merge(candidate_tgv_scores, results.benchmark_tgv_profile, on='tgv_name', suffixes=('_candidate', '_benchmark'))
+        
+        fig_radar = go.Figure()
+        fig_radar.add_trace(go.Scatterpolar(r=radar_df['tgv_match_rate_candidate'], theta=radar_df['tgv_name'], fill='toself', name=f"{candidate_info['fullname']}"))
+        fig_radar.add_trace(go.Scatterpolar(r=radar_df['tgv_match_rate_benchmark'], theta=radar_df['tgv_name'], fill='toself', name='Benchmark Avg'))
+        fig_radar.update_layout(polar=dict(radialaxis=dict(visible=True, range=[0, 100])), showlegend=True, height=400, margin=dict(l=40, r=40, t=40, b=40))
+        st.plotly_chart(fig_radar, use_container_width=True)
+        with st.expander("Benchmark baseline values"):
+            st.dataframe(results.baseline_tv, use_container_width=True, hide_index=True)
+
+    with vis_col2:
+        st.subheader("Strengths & Gaps")
+        sorted_scores = candidate_tgv_scores.iloc[::-1]
+        fig_bar = px.bar(sorted_scores, x='tgv_match_rate', y='tgv_name', orientation='h', color='tgv_match_rate', color_continuous_scale='RdYlGn', range_color=[0,100])
+        fig_bar.update_layout(yaxis_title="", xaxis_title="Match Rate (%)", height=400, margin=dict(l=10, r=10, t=40, b=10))
+        st.plotly_chart(fig_bar, use_container_width=True)
+    
+    st.subheader("Overall Match Rate Distribution")
+    fig_hist = build_distribution_chart(st.session_state.bench_key, st.session_state.data_version, results.ranked_list)
+    fig_hist.add_vline(x=candidate_info['final_match_rate'], line_width=3, line_dash="dash", line_color="red", annotation_text="Selected Candidate", annotation_position="top left")
+    st.plotly_chart(fig_hist, use_container_width=True)
+    stats = results.distribution
+    if stats['count']:
+        st.caption(f"{stats['count']} candidates · median {stats['median']:.1f}% · "
+                   f"interquartile range {stats['p25']:.1f}–{stats['p75']:.1f}% · "
+                   f"{candidate_info['fullname']} is ahead of {percentile:.0f}% of them")
 
 
 # --- 4. User Interface Layout ---
@@ -133,34 +567,41 @@ if analyze_button:
     if not all([role_name, job_level, role_purpose, benchmark_ids_str]):
         st.warning("Please fill in all the fields to start the analysis.")
     else:
-        benchmark_ids = [s.strip() for s in benchmark_ids_str.split(',') if s.strip()]
+        benchmark_ids = canonicalize_benchmark_ids(benchmark_ids_str)
+        if benchmark_ids:
+            bench_key = benchmark_key(benchmark_ids)
+            data_version = get_current_data_version()
+            # The canonical IDs are upper-cased; the queries need them as stored in the database.
+            benchmark_ids = get_benchmark_members(bench_key, data_version, benchmark_ids)
         if not benchmark_ids:
             st.warning("Please provide at least one valid benchmark employee ID.")
         else:
-            benchmark_ids_tuple = tuple(benchmark_ids)
+            st.session_state.benchmark_ids = benchmark_ids
+            st.session_state.bench_key = bench_key
+            st.session_state.data_version = data_version
+            st.session_state.talent_tables = {}
+            # The AI profile doesn't depend on the matching results, so it runs alongside the query.
+            prefetch_ai_profile(role_name, job_level, role_purpose)
             
             # Run query and store results in session state
             with st.spinner("Connecting to database and running analysis..."):
-                conn = get_db_connection()
-                st.session_state.main_df = run_talent_query(conn, benchmark_ids_tuple)
-                conn.close()
+                if use_sql_ranked_list():
+                    ranked_list = run_ranked_list_query(bench_key, st.session_state.data_version, benchmark_ids)
+                    get_benchmark_tables(bench_key, st.session_state.data_version, benchmark_ids)
+                else:
+                    # Process and enrich the ranked list
+                    ranked_list = build_ranked_list(bench_key, st.session_state.data_version, get_talent_tables())
             
-            if not st.session_state.main_df.empty:
+            if not ranked_list.empty:
                 st.success("Analysis Complete!")
                 st.session_state.analysis_run = True
-
-                # Process and enrich the ranked list
-                main_df = st.session_state.main_df
-                base_ranked_list = main_df[['employee_id', 'fullname', 'role', 'grade', 'final_match_rate']].drop_duplicates()
-                tgv_scores_df = main_df[['employee_id', 'tgv_name', 'tgv_match_rate']].drop_duplicates()
-                top_tgv = tgv_scores_df.loc[tgv_scores_df.groupby('employee_id')['tgv_match_rate'].idxmax()]
-                top_tgv = top_tgv.rename(columns={'tgv_name': 'top_tgv'}).drop(columns='tgv_match_rate')
-                strengths_df = main_df[main_df['source'] == 'strengths'][['employee_id', 'tv_name']].drop_duplicates()
-                agg_strengths = strengths_df.groupby('employee_id')['tv_name'].apply(lambda x: ', '.join(x.head(3))).reset_index()
-                agg_strengths = agg_strengths.rename(columns={'tv_name': 'top_strengths'})
-                ranked_list_final = pd.merge(base_ranked_list, top_tgv, on='employee_id', how='left')
-                ranked_list_final = pd.merge(ranked_list_final, agg_strengths, on='employee_id', how='left')
-                st.session_state.ranked_list = ranked_list_final.sort_values('final_match_rate', ascending=False).reset_index(drop=True)
+                st.session_state.ranked_list = ranked_list
+                st.session_state.analysis_results = build_analysis_results(ranked_list)
+                # Filters, pages and selections of the previous analysis don't apply to this one.
+                for key in [k for k in st.session_state if k.startswith(('grid_', 'candidate_'))]:
+                    del st.session_state[key]
+                if use_llm_summaries():
+                    prefetch_ai_summaries(ranked_list, role_name)
 
             else:
                 st.error("No data returned. Please check benchmark IDs and database connection.")
@@ -171,67 +612,30 @@ if analyze_button:
 if st.session_state.analysis_run and not st.session_state.ranked_list.empty:
     st.markdown("---")
     
-    # Retrieve data from session state
-    main_df = st.session_state.main_df
-    ranked_list = st.session_state.ranked_list
-
     # Display Section 1: AI Job Profile
     st.header("1. AI Generated Job Profile")
-    ai_profile = generate_ai_profile(role_name, job_level, role_purpose)
-    st.markdown(ai_profile)
+    ai_profile_placeholder = st.empty()
+    generate_ai_profile(role_name, job_level, role_purpose, render=ai_profile_placeholder.markdown)
     
     st.markdown("---")
 
     # Display Section 2: Ranked Talent List
     st.header("2. Ranked Talent List")
-    st.dataframe(ranked_list, use_container_width=True)
+    ranked_list_grid(st.session_state.analysis_results)
     
     st.markdown("---")
     
     # Display Section 3: In-Depth Candidate Dashboard
     st.header("3. In-Depth Candidate Dashboard")
-    selected_employee_id = st.selectbox(
-        "Select a candidate to analyze:",
-        options=ranked_list['employee_id'],
-        format_func=lambda x: f"{x} - {ranked_list.loc[ranked_list['employee_id'] == x, 'fullname'].iloc[0]}"
-    )
+    candidate_dashboard(role_name)
 
-    if selected_employee_id:
-        candidate_data = main_df[main_df['employee_id'] == selected_employee_id]
-        candidate_info = ranked_list[ranked_list['employee_id'] == selected_employee_id].iloc[0]
-
-        # Prepare arguments for cached AI summary function
-        candidate_info_tuple = tuple(candidate_info.to_dict().items())
-        tgv_scores_df = candidate_data[['tgv_name', 'tgv_match_rate']].drop_duplicates().sort_values('tgv_match_rate', ascending=False)
-        tgv_scores_tuple = tuple(map(tuple, tgv_scores_df.to_numpy()))
-
-        ai_summary = generate_ai_summary(candidate_info_tuple, tgv_scores_tuple, role_name)
-        st.info(f"**AI Analyst Summary for {candidate_info['fullname']}:**\n\n{ai_summary}")
-
-        # Visualization columns
-        vis_col1, vis_col2 = st.columns(2)
-        with vis_col1:
-            st.subheader("TGV Profile vs. Benchmark")
-            candidate_tgv_scores = candidate_data[['tgv_name', 'tgv_match_rate']].drop_duplicates()
-            benchmark_ids_list = [s.strip() for s in benchmark_ids_str.split(',') if s.strip()]
-            benchmark_tgv_scores = main_df[main_df['employee_id'].isin(benchmark_ids_list)][['tgv_name', 'tgv_match_rate']].groupby('tgv_name')['tgv_match_rate'].mean().reset_index()
-            radar_df = pd.merge(candidate_tgv_scores, benchmark_tgv_scores, on='tgv_name', suffixes=('_candidate', '_benchmark'))
-            
-            fig_radar = go.Figure()
-            fig_radar.add_trace(go.Scatterpolar(r=radar_df['tgv_match_rate_candidate'], theta=radar_df['tgv_name'], fill='toself', name=f"{candidate_info['fullname']}"))
-            fig_radar.add_trace(go.Scatterpolar(r=radar_df['tgv_match_rate_benchmark'], theta=radar_df['tgv_name'], fill='toself', name='Benchmark Avg'))
-            fig_radar.update_layout(polar=dict(radialaxis=dict(visible=True, range=[0, 100])), showlegend=True, height=400, margin=dict(l=40, r=40, t=40, b=40))
-            st.plotly_chart(fig_radar, use_container_width=True)
-
-        with vis_col2:
-            st.subheader("Strengths & Gaps")
-            sorted_scores = candidate_tgv_scores.sort_values('tgv_match_rate', ascending=True)
-            fig_bar = px.bar(sorted_scores, x='tgv_match_rate', y='tgv_name', orientation='h', color='tgv_match_rate', color_continuous_scale='RdYlGn', range_color=[0,100])
-            fig_bar.update_layout(yaxis_title="", xaxis_title="Match Rate (%)", height=400, margin=dict(l=10, r=10, t=40, b=10))
-            st.plotly_chart(fig_bar, use_container_width=True)
-        
-        st.subheader("Overall Match Rate Distribution")
-        fig_hist = px.histogram(ranked_list, x="final_match_rate", nbins=20, title="Distribution Across All Candidates")
-        fig_hist.add_vline(x=candidate_info['final_match_rate'], line_width=3, line_dash="dash", line_color="red", annotation_text="Selected Candidate", annotation_position="top left")
-        st.plotly_chart(fig_hist, use_container_width=True)
 
+# --- 7. Diagnostics (optional) ---
+if st.secrets.get("show_llm_stats", False):
+    with st.expander("LLM call statistics"):
+        provider = get_llm_provider()
+        if hasattr(provider, 'timings'):
+            st.write("Call timings (setup vs network):", provider.timings.summary())
+        llm_cache = get_llm_cache()
+        if hasattr(llm_cache, 'stats'):
+            st.write("Response cache:", llm_cache.stats())
@@ -0,0 +1,21 @@
+import hashlib
+
+
+# --- Benchmark Set Canonicalization ---
+# "A,B", "b, a, A" and ["B", "A"] all describe the same benchmark set. Every cached result is keyed by
+# the canonical form (or its hash) so equivalent requests hit the same cache entries. Since IDs are
+# upper-cased here, the app resolves them to the IDs as stored before querying.
+
+def canonicalize_benchmark_ids(benchmark_ids):
+    # Accepts the raw comma-separated text box value or any iterable of IDs.
+    # Returns a sorted tuple of unique, trimmed, upper-cased IDs.
+    if isinstance(benchmark_ids, str):
+        benchmark_ids = benchmark_ids.split(',')
+    return tuple(sorted({' '.join(str(i).split()).upper() for i in benchmark_ids} - {''}))
+
+
+def benchmark_key(benchmark_ids):
+    # Short, stable hash of the canonical benchmark set, used as the cache key for query results
+    # and everything derived from them (ranked list, baselines, charts).
+    canonical = canonicalize_benchmark_ids(benchmark_ids)
+    return hashlib.sha256('\n'.join(canonical).encode('utf-8')).hexdigest()[:16]
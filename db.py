@@ -0,0 +1,190 @@
+import io
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+import pyarrow as pa
+from pyarrow import csv as pa_csv
+from psycopg2 import pool as pg_pool
+
+
+# --- Database Connection Pool ---
+# A thread-safe pool of psycopg2 connections shared by every Streamlit session in the process.
+# Callers borrow a connection with `with pool.connection() as conn:`; it is handed back on exit
+# (committed on success, rolled back on error) instead of being closed.
+
+def _is_disconnect(exc):
+    # True if the exception (or anything it was raised from) means the socket is gone.
+    while exc is not None:
+        if isinstance(exc, (psycopg2.OperationalError, psycopg2.InterfaceError)):
+            return True
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+
+class ConnectionPool:
+    def __init__(self, minconn=1, maxconn=10, checkout_timeout=30, ping_after=60, **connect_kwargs):
+        # `ping_after` is the idle time (seconds) after which a connection is probed with SELECT 1
+        # before being handed out, so we don't pay an extra round trip on every checkout.
+        self.maxconn = maxconn
+        self.checkout_timeout = checkout_timeout
+        self.ping_after = ping_after
+        self._pool = pg_pool.ThreadedConnectionPool(minconn, maxconn, **connect_kwargs)
+        # ThreadedConnectionPool raises PoolError when exhausted; the semaphore makes callers
+        # wait for a free slot instead.
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._last_used = {}
+        self._lock = threading.Lock()
+
+    def _is_alive(self, conn):
+        if conn.closed:
+            return False
+        with self._lock:
+            idle = time.monotonic() - self._last_used.get(id(conn), 0)
+        if idle < self.ping_after:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, conn):
+        with self._lock:
+            self._last_used.pop(id(conn), None)
+        self._pool.putconn(conn, close=True)
+
+    def _expire_idle(self):
+        # After a disconnect the other idle connections are probably dead too (e.g. the server restarted),
+        # so each of them is pinged on its next checkout regardless of `ping_after`.
+        with self._lock:
+            self._last_used.clear()
+
+    def checkout(self):
+        # Borrows a live connection, replacing dead ones transparently.
+        if not self._slots.acquire(timeout=self.checkout_timeout):
+            raise pg_pool.PoolError(f"No database connection available after {self.checkout_timeout}s")
+        try:
+            conn = self._pool.getconn()
+            while not self._is_alive(conn):
+                self._discard(conn)
+                conn = self._pool.getconn()
+            return conn
+        except Exception:
+            self._slots.release()
+            raise
+
+    def checkin(self, conn, broken=False):
+        # Returns a connection to the pool; broken connections are closed and dropped.
+        try:
+            if broken or conn.closed:
+                self._discard(conn)
+            else:
+                with self._lock:
+                    self._last_used[id(conn)] = time.monotonic()
+                self._pool.putconn(conn)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        conn = self.checkout()
+        broken = False
+        try:
+            yield conn
+            conn.commit()
+        except Exception as e:
+            broken = _is_disconnect(e)
+            if not broken:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    broken = True
+            raise
+        finally:
+            self.checkin(conn, broken=broken)
+
+    def run(self, fn, retries=1):
+        # Calls fn(conn) with a pooled connection. If the server dropped the connection
+        # (OperationalError), reconnects and retries up to `retries` times.
+        for attempt in range(retries + 1):
+            try:
+                with self.connection() as conn:
+                    return fn(conn)
+            except Exception as e:
+                if attempt == retries or not _is_disconnect(e):
+                    raise
+                self._expire_idle()
+
+    def close(self):
+        self._pool.closeall()
+
+
+# --- Command-Line Connections ---
+
+def connect_from_secrets(path='.streamlit/secrets.toml'):
+    # A plain psycopg2 connection using the app's secrets file, for the command-line tools.
+    # tomllib is Python 3.11+; older versions use the toml package Streamlit already depends on.
+    try:
+        import tomllib
+        with open(path, 'rb') as f:
+            secrets = tomllib.load(f)
+    except ImportError:
+        import toml
+        secrets = toml.load(path)
+    return psycopg2.connect(host=secrets['db_host'], database=secrets['db_name'], user=secrets['db_user'],
+                            password=secrets['db_password'], port=secrets['db_port'])
+
+
+# --- Bulk Result Fetch ---
+# pd.read_sql_query builds a Python tuple per row (and a Decimal per numeric value). For large results
+# we instead stream the query through COPY ... TO STDOUT as CSV and let Arrow parse it in C++, straight
+# into float64 columns and dictionary-encoded (pandas Categorical) strings.
+
+ARROW_TYPES = {
+    'float64': pa.float64(),
+    'string': pa.string(),
+    'category': pa.dictionary(pa.int32(), pa.string()),
+}
+
+
+def fetch_frame(conn, sql, params=None, column_types=None):
+    # `column_types` maps column names to 'float64', 'string' or 'category'; other columns are inferred.
+    with conn.cursor() as cur:
+        # COPY can't take bind parameters, so they are interpolated client-side with psycopg2's quoting.
+        query = cur.mogrify(sql, params).decode(conn.encoding) if params is not None else sql
+        query = query.strip().rstrip(';')
+        buffer = io.BytesIO()
+        # The newline before ')' keeps a trailing "--" comment in the SQL from swallowing it.
+        cur.copy_expert(f"COPY (\n{query}\n) TO STDOUT WITH (FORMAT csv, HEADER true)", buffer)
+    buffer.seek(0)
+    convert_options = pa_csv.ConvertOptions(
+        column_types={name: ARROW_TYPES[kind] for name, kind in (column_types or {}).items()},
+        # COPY writes NULL as an empty field and '' as a quoted empty field; keep them distinct. Text such
+        # as NA or null is written unquoted, so Arrow's other default null markers must not apply.
+        null_values=[''],
+        strings_can_be_null=True,
+        quoted_strings_can_be_null=False,
+    )
+    table = pa_csv.read_csv(buffer, convert_options=convert_options)
+    return table.to_pandas()
+
+
+# --- Change Tracking ---
+
+def table_change_counters(conn, tables):
+    # 'table:count,...' where count is the table's insert/update/delete counter from pg_stat_user_tables.
+    # Cheap to read, and it changes whenever any of the tables is modified.
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT COALESCE(string_agg(relname || ':' || (n_tup_ins + n_tup_upd + n_tup_del), ',' ORDER BY relname), '')
+            FROM pg_stat_user_tables
+            WHERE relname IN %s
+            """,
+            (tuple(tables),)
+        )
+        return cur.fetchone()[0]
@@ -0,0 +1,136 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+# --- LLM Response Cache ---
+# Generated texts are cached by model name + prompt, so the page and background workers share results.
+
+def normalize_prompt(prompt):
+    # Line endings, trailing spaces and surrounding blank lines don't change what the model is asked.
+    lines = prompt.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    return '\n'.join(line.rstrip() for line in lines).strip()
+
+
+def prompt_key(model_name, prompt):
+    return hashlib.sha256(f"{model_name}\n{normalize_prompt(prompt)}".encode('utf-8')).hexdigest()
+
+
+class MemoryCache:
+    # Thread-safe, size-bounded (LRU) in-process cache.
+    def __init__(self, max_entries=2000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def contains(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class SQLiteCache:
+    # Persistent cache in a SQLite file, shared by every app process on the host and kept across
+    # restarts. Entries expire after `ttl_seconds`; past `max_bytes` of text the least recently used
+    # entries are evicted. Hit/miss counters are stored in the same file, so they cover all processes;
+    # they count get() (a text being served), not contains() (an existence check, which writes nothing).
+    def __init__(self, path, ttl_seconds=30 * 24 * 3600, max_bytes=64 * 1024 * 1024):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_last_used_idx ON llm_cache (last_used)")
+            conn.execute("CREATE TABLE IF NOT EXISTS llm_cache_stats (name TEXT PRIMARY KEY, count INTEGER NOT NULL)")
+
+    def _connect(self):
+        # One connection per thread (sqlite3 connections can't be shared across threads by default).
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            self._local.conn = conn
+        return conn
+
+    def _count(self, conn, name):
+        conn.execute(
+            "INSERT INTO llm_cache_stats (name, count) VALUES (?, 1) "
+            "ON CONFLICT (name) DO UPDATE SET count = count + 1",
+            (name,)
+        )
+
+    def contains(self, key):
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT 1 FROM llm_cache WHERE key = ? AND created_at > ?", (key, time.time() - self.ttl_seconds)
+        ).fetchone()
+        return row is not None
+
+    def get(self, key):
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value FROM llm_cache WHERE key = ? AND created_at > ?", (key, now - self.ttl_seconds)
+            ).fetchone()
+            if row is None:
+                self._count(conn, 'misses')
+                return None
+            conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (now, key))
+            self._count(conn, 'hits')
+            return row[0]
+
+    def set(self, key, value):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, size, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value.encode('utf-8')), now, now)
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        # Drops expired entries, then the least recently used ones until the cache fits in max_bytes.
+        conn.execute("DELETE FROM llm_cache WHERE created_at <= ?", (now - self.ttl_seconds,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in conn.execute("SELECT key, size FROM llm_cache ORDER BY last_used").fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            total -= size
+
+    def stats(self):
+        # {'hits', 'misses', 'entries', 'bytes'} across every process using this file.
+        with self._connect() as conn:
+            counters = dict(conn.execute("SELECT name, count FROM llm_cache_stats").fetchall())
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+        return {'hits': counters.get('hits', 0), 'misses': counters.get('misses', 0), 'entries': entries, 'bytes': size}
@@ -0,0 +1,150 @@
+import random
+import threading
+import time
+
+
+# --- LLM Client ---
+# Every Gemini call goes through one LLMClient per process. It
+# - rate limits requests with a token bucket shared by page requests and background workers,
+# - retries transient failures (rate limiting, 5xx, timeouts) with exponential backoff and jitter,
+# - coalesces identical in-flight prompts ("single flight"): concurrent callers share one request.
+# Failures are raised to the caller, never returned as text, so nothing downstream can cache them.
+
+TRANSIENT_STATUS_CODES = (408, 429, 500, 502, 503, 504)
+
+
+def is_transient(exc):
+    # Google API errors carry the HTTP status in `code`; network errors are retried as well.
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return True
+    return getattr(exc, 'code', None) in TRANSIENT_STATUS_CODES
+
+
+class TokenBucket:
+    def __init__(self, rate_per_minute=60, burst=5):
+        # Refills at `rate_per_minute`, allowing up to `burst` requests back to back.
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(burst)
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        # Blocks until a request may be sent.
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class _Flight:
+    # One in-flight request; followers wait on `done` and reuse its result or error.
+    def __init__(self):
+        self.done = threading.Event()
+        self.text = None
+        self.error = None
+
+
+class LLMClient:
+    def __init__(self, generate, stream=None, rate_per_minute=60, burst=5, max_retries=3, base_delay=1.0, max_delay=30.0):
+        # `generate(prompt, **options)` returns the response text; `stream(prompt)` yields it in chunks
+        # (without it, stream() yields the whole text at once).
+        self._generate = generate
+        self._stream = stream
+        self.bucket = TokenBucket(rate_per_minute, burst)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def _backoff(self, attempt):
+        delay = min(self.max_delay, self.base_delay * 2 ** attempt)
+        time.sleep(delay * random.uniform(0.5, 1.0))
+
+    def _call(self, fn):
+        # Runs fn() under the rate limit, retrying transient errors.
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            try:
+                return fn()
+            except Exception as e:
+                if attempt == self.max_retries or not is_transient(e):
+                    raise
+            self._backoff(attempt)
+
+    def _join(self, key):
+        # Returns (flight, is_leader). The leader must call _land() when its request finishes.
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                return flight, False
+            flight = self._flights[key] = _Flight()
+            return flight, True
+
+    def _land(self, key, flight, text=None, error=None):
+        flight.text, flight.error = text, error
+        with self._lock:
+            self._flights.pop(key, None)
+        flight.done.set()
+
+    def _follow(self, flight):
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.text
+
+    def generate(self, prompt, **options):
+        key = (prompt, repr(sorted(options.items())))
+        flight, is_leader = self._join(key)
+        if not is_leader:
+            return self._follow(flight)
+        try:
+            text = self._call(lambda: self._generate(prompt, **options))
+        except Exception as e:
+            self._land(key, flight, error=e)
+            raise
+        self._land(key, flight, text=text)
+        return text
+
+    def stream(self, prompt):
+        # Yields the response in chunks. Retries only happen before the first chunk arrives; a caller
+        # that joins a prompt already being generated gets the complete text as a single chunk.
+        key = (prompt, repr([]))
+        flight, is_leader = self._join(key)
+        if not is_leader:
+            yield self._follow(flight)
+            return
+        if self._stream is None:
+            try:
+                text = self._call(lambda: self._generate(prompt))
+            except Exception as e:
+                self._land(key, flight, error=e)
+                raise
+            self._land(key, flight, text=text)
+            yield text
+            return
+        chunks = []
+        try:
+            for attempt in range(self.max_retries + 1):
+                self.bucket.acquire()
+                try:
+                    for chunk in self._stream(prompt):
+                        chunks.append(chunk)
+                        yield chunk
+                    break
+                except Exception as e:
+                    if chunks or attempt == self.max_retries or not is_transient(e):
+                        raise
+                self._backoff(attempt)
+        except BaseException as e:
+            # Includes GeneratorExit when the caller stops reading; followers then see the error.
+            self._land(key, flight, error=e if isinstance(e, Exception) else RuntimeError("Stream was abandoned"))
+            raise
+        self._land(key, flight, text=''.join(chunks))
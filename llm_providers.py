@@ -0,0 +1,187 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+from llm_cache import prompt_key
+
+
+# --- LLM Providers ---
+# Backends behind llm_client.LLMClient. Each provider has a `model_name` (part of every cache key, so
+# texts from different backends never mix) plus generate(prompt, generation_config=None) and stream(prompt).
+#   GeminiProvider    the real Gemini API
+#   StubProvider      deterministic offline texts with configurable latency, for load tests and CI
+#   CassetteProvider  records another provider's responses to a JSON-lines file, or replays them offline
+
+class CallTimings:
+    # Per-process totals of time spent setting up LLM calls (client and model objects) vs waiting on the
+    # network. Thread-safe; summary() gives averages in milliseconds.
+    def __init__(self):
+        self.calls = 0
+        self.setup_seconds = 0.0
+        self.network_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, setup_seconds, network_seconds):
+        with self._lock:
+            self.calls += 1
+            self.setup_seconds += setup_seconds
+            self.network_seconds += network_seconds
+
+    def summary(self):
+        with self._lock:
+            calls = max(self.calls, 1)
+            return {
+                'calls': self.calls,
+                'avg_setup_ms': round(self.setup_seconds / calls * 1000, 2),
+                'avg_network_ms': round(self.network_seconds / calls * 1000, 2),
+            }
+
+
+class GeminiProvider:
+    # Holds one configured GenerativeModel per generation config for the life of the process, so calls
+    # reuse the SDK client and its HTTP/gRPC connections instead of setting them up again every time.
+    def __init__(self, model_name, api_key, api_endpoint=None):
+        import google.generativeai as genai
+
+        # `api_endpoint` points the SDK (REST transport) at another host, e.g. a local stub server.
+        if api_endpoint:
+            genai.configure(api_key=api_key, transport="rest", client_options={"api_endpoint": api_endpoint})
+        else:
+            genai.configure(api_key=api_key)
+        self.model_name = model_name
+        self.timings = CallTimings()
+        self._genai = genai
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def _model(self, generation_config=None):
+        key = json.dumps(generation_config, sort_keys=True)
+        with self._lock:
+            model = self._models.get(key)
+            if model is None:
+                model = self._models[key] = self._genai.GenerativeModel(self.model_name, generation_config=generation_config)
+            return model
+
+    def generate(self, prompt, generation_config=None):
+        started = time.perf_counter()
+        model = self._model(generation_config)
+        sent = time.perf_counter()
+        try:
+            return model.generate_content(prompt).text
+        finally:
+            self.timings.record(sent - started, time.perf_counter() - sent)
+
+    def stream(self, prompt):
+        started = time.perf_counter()
+        model = self._model()
+        sent = time.perf_counter()
+        try:
+            for chunk in model.generate_content(prompt, stream=True):
+                if chunk.parts:
+                    yield chunk.text
+        finally:
+            self.timings.record(sent - started, time.perf_counter() - sent)
+
+
+class StubProvider:
+    # `outputs` maps a substring of the prompt to the text to return (first match wins); other prompts
+    # get a fixed text tagged with a hash of the prompt. JSON requests (batched summaries) are answered
+    # with one entry per "**Candidate <id>:**" block. `latency` is the delay before the response,
+    # `chunk_delay` the delay between streamed chunks.
+    model_name = 'stub'
+
+    def __init__(self, latency=0.5, chunk_delay=0.02, outputs=None):
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+        self.outputs = dict(outputs or {})
+
+    def _text(self, prompt):
+        for needle, text in self.outputs.items():
+            if needle in prompt:
+                return text
+        digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:8]
+        return f"Stub response {digest}: this text was generated offline without calling an LLM."
+
+    def generate(self, prompt, generation_config=None):
+        time.sleep(self.latency)
+        if (generation_config or {}).get('response_mime_type') == 'application/json':
+            ids = re.findall(r"\*\*Candidate (.+?):\*\*", prompt)
+            return json.dumps({employee_id: self._text(f"{employee_id}\n{prompt}") for employee_id in ids})
+        return self._text(prompt)
+
+    def stream(self, prompt):
+        time.sleep(self.latency)
+        words = self._text(prompt).split(' ')
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(self.chunk_delay)
+            yield word if i == len(words) - 1 else word + ' '
+
+
+class CassetteProvider:
+    # In "record" mode every response of `inner` is appended to the cassette file; in "replay" mode
+    # responses are served from the file only, and a prompt that was never recorded raises LookupError.
+    def __init__(self, path, mode='replay', inner=None, model_name=None):
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"Unknown cassette mode: {mode!r}")
+        if mode == 'record' and inner is None:
+            raise ValueError("Recording a cassette needs a provider to record from")
+        self.path = path
+        self.mode = mode
+        self.inner = inner
+        # Replayed texts keep the recorded model's name, so they share its cache entries.
+        self.model_name = model_name or (inner.model_name if inner is not None else 'cassette')
+        self._entries = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries[entry['key']] = entry['text']
+        elif mode == 'replay':
+            raise FileNotFoundError(f"Cassette not found: {path}")
+
+    def _key(self, prompt, generation_config):
+        # Independent of the model name, so a cassette replays whatever it was recorded from.
+        return prompt_key(json.dumps(generation_config, sort_keys=True), prompt)
+
+    def _record(self, key, prompt, text):
+        with self._lock:
+            self._entries[key] = text
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({'key': key, 'model': self.model_name, 'prompt': prompt, 'text': text}) + '\n')
+
+    def generate(self, prompt, generation_config=None):
+        key = self._key(prompt, generation_config)
+        with self._lock:
+            text = self._entries.get(key)
+        if text is not None:
+            return text
+        if self.mode == 'replay':
+            raise LookupError(f"Prompt not recorded in cassette {self.path}")
+        text = self.inner.generate(prompt, generation_config=generation_config)
+        self._record(key, prompt, text)
+        return text
+
+    def stream(self, prompt):
+        # Replays are not chunked; recording streams from the inner provider and stores the full text.
+        key = self._key(prompt, None)
+        with self._lock:
+            text = self._entries.get(key)
+        if text is not None:
+            yield text
+            return
+        if self.mode == 'replay':
+            raise LookupError(f"Prompt not recorded in cassette {self.path}")
+        chunks = []
+        for chunk in self.inner.stream(prompt):
+            chunks.append(chunk)
+            yield chunk
+        self._record(key, prompt, ''.join(chunks))
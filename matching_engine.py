@@ -0,0 +1,301 @@
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+
+# --- In-Memory Matching Engine ---
+# A NumPy re-implementation of query.sql (Steps 3-7) over columnar arrays. UnifiedTalentData and the
+# employee dimension are loaded from the database once; re-scoring a benchmark set afterwards is pure
+# array work with no database round trip. Results have the same columns and values as query.sql.
+
+TV_MATCH_CAP = 150.0
+HIGHER_IS_BETTER, LOWER_IS_BETTER, CATEGORICAL = 0, 1, 2
+DIRECTION_CODES = {'higher_is_better': HIGHER_IS_BETTER, 'lower_is_better': LOWER_IS_BETTER, 'categorical': CATEGORICAL}
+
+RESULT_COLUMNS = [
+    'employee_id', 'fullname', 'directorate', 'role', 'grade',
+    'tgv_name', 'tv_name', 'source', 'tv_rank', 'baseline_score', 'user_score',
+    'tv_match_rate', 'tgv_match_rate', 'final_match_rate',
+]
+
+EMPLOYEES_SQL = """
+    SELECT e.employee_id, e.fullname, ddir.name AS directorate, dpos.name AS role, dgra.name AS grade
+    FROM employees e
+    LEFT JOIN dim_directorates ddir ON e.directorate_id = ddir.directorate_id
+    LEFT JOIN dim_positions dpos ON e.position_id = dpos.position_id
+    LEFT JOIN dim_grades dgra ON e.grade_id = dgra.grade_id
+"""
+
+
+def _pg_text(value):
+    # Mirrors Postgres' double precision -> TEXT cast ('120', '5.5') so text columns compare equal.
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _round2(values):
+    # ROUND(numeric, 2) rounds half away from zero; np.round would round half to even.
+    return np.sign(values) * np.floor(np.abs(values) * 100 + 0.5) / 100
+
+
+class TalentArrays:
+    # Integer-coded, columnar copy of UnifiedTalentData (one entry per employee x TV row).
+    # A "TV group" is a (tgv_name, tv_name, scoring_direction) triple, the grouping key of BenchmarkBaseline.
+    def __init__(self, unified_df, employees_df):
+        # Categorical inputs (e.g. from db.fetch_frame) are compared as plain values: category order
+        # would otherwise leak into the MODE() tie-break and the group numbering.
+        label_columns = ['employee_id', 'tgv_name', 'tv_name', 'scoring_direction', 'source', 'score_categorical']
+        unified_df = unified_df.astype({col: object for col in label_columns})
+        employees_df = employees_df.astype({'employee_id': object})
+        self.emp, self.emp_ids = pd.factorize(unified_df['employee_id'])
+        tv_columns = ['tgv_name', 'tv_name', 'scoring_direction']
+        self.tv = unified_df.groupby(tv_columns, sort=False, dropna=False).ngroup().to_numpy()
+        tv_keys = unified_df[tv_columns].drop_duplicates().reset_index(drop=True)
+        tv_tgv, self.tgv_names = pd.factorize(tv_keys['tgv_name'])
+        self.tv_tgv = tv_tgv
+        self.tv_names = tv_keys['tv_name'].to_numpy(dtype=object)
+        self.tv_direction = tv_keys['scoring_direction'].map(DIRECTION_CODES).fillna(-1).to_numpy(dtype=np.int8)
+        self.source, self.source_values = pd.factorize(unified_df['source'])
+        self.tv_rank = pd.to_numeric(unified_df['tv_rank'], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+
+        self.score_numeric = pd.to_numeric(unified_df['score_numeric'], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+        # sort=True keeps codes in value order, so the smallest code wins MODE() ties like in Postgres.
+        self.score_cat, self.cat_values = pd.factorize(unified_df['score_categorical'], sort=True)
+        # user_score doesn't depend on the benchmark, so it is rendered once here.
+        cat_text = np.append(self.cat_values.to_numpy(dtype=object), None)
+        user_score = cat_text[self.score_cat]
+        has_num = ~np.isnan(self.score_numeric)
+        user_score[has_num] = [_pg_text(v) for v in self.score_numeric[has_num]]
+        self.user_score = user_score
+
+        employees = employees_df.drop_duplicates('employee_id').set_index('employee_id')
+        self.in_employees = self.emp_ids.isin(employees.index)
+        self.employees = employees.reindex(self.emp_ids)
+
+    @property
+    def n_employees(self):
+        return len(self.emp_ids)
+
+    def baseline(self, benchmark_ids):
+        # Step 3: per TV group, the MEDIAN numeric score and MODE categorical score of the benchmark.
+        # Returns (has_baseline, baseline_numeric, baseline_categorical_code) arrays indexed by TV group.
+        n_tv = len(self.tv_names)
+        bench = np.zeros(self.n_employees, dtype=bool)
+        idx = self.emp_ids.get_indexer(list(benchmark_ids))
+        bench[idx[idx >= 0]] = True
+        bench &= self.in_employees
+        rows = bench[self.emp]
+        has_baseline = np.bincount(self.tv[rows], minlength=n_tv) > 0
+
+        # PERCENTILE_CONT(0.5): mean of the two middle values of each sorted group.
+        num_rows = rows & ~np.isnan(self.score_numeric)
+        tv, scores = self.tv[num_rows], self.score_numeric[num_rows]
+        order = np.lexsort((scores, tv))
+        tv, scores = tv[order], scores[order]
+        counts = np.bincount(tv, minlength=n_tv)
+        starts = np.cumsum(counts) - counts
+        has_num = counts > 0
+        baseline_num = np.full(n_tv, np.nan)
+        lo = starts[has_num] + (counts[has_num] - 1) // 2
+        hi = starts[has_num] + counts[has_num] // 2
+        baseline_num[has_num] = (scores[lo] + scores[hi]) / 2
+
+        # MODE(): most frequent value; ties go to the first value in sort order.
+        n_cat = max(len(self.cat_values), 1)
+        cat_rows = rows & (self.score_cat >= 0)
+        pairs, pair_counts = np.unique(self.tv[cat_rows].astype(np.int64) * n_cat + self.score_cat[cat_rows], return_counts=True)
+        pair_tv, pair_cat = pairs // n_cat, pairs % n_cat
+        order = np.lexsort((pair_cat, -pair_counts, pair_tv))
+        pair_tv, pair_cat = pair_tv[order], pair_cat[order]
+        first = np.r_[True, pair_tv[1:] != pair_tv[:-1]] if len(pair_tv) else np.zeros(0, dtype=bool)
+        baseline_cat = np.full(n_tv, -1, dtype=np.int64)
+        baseline_cat[pair_tv[first]] = pair_cat[first]
+        return has_baseline, baseline_num, baseline_cat
+
+    def _match(self, benchmark_ids):
+        # Steps 3-6 of query.sql. Returns the row selection and the TV / TGV / final rates as arrays.
+        has_baseline, baseline_num, baseline_cat = self.baseline(benchmark_ids)
+
+        # Step 4: TV match rate for every row whose TV has a baseline.
+        rows = np.flatnonzero(has_baseline[self.tv])
+        tv = self.tv[rows]
+        emp = self.emp[rows]
+        score = self.score_numeric[rows]
+        cat = self.score_cat[rows]
+        base = baseline_num[tv]
+        direction = self.tv_direction[tv]
+        rate = np.zeros(len(tv))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            positive = base > 0
+            # LEAST() ignores NULLs, so a missing higher_is_better score scores the cap, exactly as in SQL.
+            higher = (direction == HIGHER_IS_BETTER) & positive
+            rate[higher] = np.where(np.isnan(score[higher]), TV_MATCH_CAP,
+                                    np.minimum(score[higher] / base[higher] * 100, TV_MATCH_CAP))
+            lower = (direction == LOWER_IS_BETTER) & positive & ~np.isnan(score)
+            rate[lower] = np.minimum((2 * base[lower] - score[lower]) / base[lower] * 100, TV_MATCH_CAP)
+        categorical = direction == CATEGORICAL
+        rate[categorical] = np.where((cat[categorical] >= 0) & (cat[categorical] == baseline_cat[tv][categorical]), 100.0, 0.0)
+
+        # Step 5: TGV match rate = mean TV rate per (employee, TGV).
+        n_tgv = max(len(self.tgv_names), 1)
+        group_keys, group_of_row = np.unique(emp.astype(np.int64) * n_tgv + self.tv_tgv[tv], return_inverse=True)
+        tgv_rate = np.bincount(group_of_row, weights=rate) / np.bincount(group_of_row)
+
+        # Step 6: final match rate = mean TGV rate per employee.
+        group_emp = group_keys // n_tgv
+        final_rate = (np.bincount(group_emp, weights=tgv_rate, minlength=self.n_employees)
+                      / np.maximum(np.bincount(group_emp, minlength=self.n_employees), 1))
+
+        baseline_text = np.array([
+            _pg_text(baseline_num[i]) if not np.isnan(baseline_num[i])
+            else (self.cat_values[baseline_cat[i]] if baseline_cat[i] >= 0 else None)
+            for i in range(len(self.tv_names))
+        ], dtype=object)
+        return {
+            'rows': rows, 'rate': rate, 'group_of_row': group_of_row, 'baseline_text': baseline_text,
+            'group_emp': group_emp, 'group_tgv': group_keys % n_tgv, 'tgv_rate': tgv_rate, 'final_rate': final_rate,
+        }
+
+    def _tv_columns(self, match, out):
+        # TV-level columns for the selected rows (`out` is a mask over match['rows']).
+        rows = match['rows'][out]
+        tv = self.tv[rows]
+        return {
+            'employee_id': self.emp_ids.to_numpy(dtype=object)[self.emp[rows]],
+            'tgv_name': self.tgv_names.to_numpy(dtype=object)[self.tv_tgv[tv]],
+            'tv_name': self.tv_names[tv],
+            'source': self.source_values.to_numpy(dtype=object)[self.source[rows]],
+            'tv_rank': self.tv_rank[rows],
+            'baseline_score': match['baseline_text'][tv],
+            'user_score': self.user_score[rows],
+            'tv_match_rate': _round2(match['rate'][out]),
+        }
+
+    def score(self, benchmark_ids):
+        # Runs Steps 3-7 of query.sql for one benchmark set and returns the same long-format DataFrame.
+        match = self._match(benchmark_ids)
+        # Step 7: only employees present in the employees table, with their dimension data.
+        emp = self.emp[match['rows']]
+        out = self.in_employees[emp]
+        emp = emp[out]
+        result = self._tv_columns(match, out)
+        for col in ('fullname', 'directorate', 'role', 'grade'):
+            result[col] = self.employees[col].to_numpy(dtype=object)[emp]
+        result['tgv_match_rate'] = _round2(match['tgv_rate'][match['group_of_row'][out]])
+        result['final_match_rate'] = _round2(match['final_rate'][emp])
+        return pd.DataFrame(result, columns=RESULT_COLUMNS)
+
+    def score_tables(self, benchmark_ids):
+        # Same results as score(), as the three normalized relations returned by
+        # talent_queries.fetch_talent_tables (employees, employee x TGV, employee x TV).
+        match = self._match(benchmark_ids)
+        emp_ids = self.emp_ids.to_numpy(dtype=object)
+
+        scored = np.zeros(self.n_employees, dtype=bool)
+        scored[match['group_emp']] = True
+        employees = np.flatnonzero(scored & self.in_employees)
+        employees_df = pd.DataFrame({
+            'employee_id': emp_ids[employees],
+            **{col: self.employees[col].to_numpy(dtype=object)[employees] for col in ('fullname', 'directorate', 'role', 'grade')},
+            'final_match_rate': _round2(match['final_rate'][employees]),
+        })
+
+        groups = self.in_employees[match['group_emp']]
+        tgv_df = pd.DataFrame({
+            'employee_id': emp_ids[match['group_emp'][groups]],
+            'tgv_name': self.tgv_names.to_numpy(dtype=object)[match['group_tgv'][groups]],
+            'tgv_match_rate': _round2(match['tgv_rate'][groups]),
+        })
+
+        tv_df = pd.DataFrame(self._tv_columns(match, self.in_employees[self.emp[match['rows']]]))
+        return {'employees': employees_df, 'tgv': tgv_df, 'tv': tv_df}
+
+
+def load_talent_arrays(conn):
+    # Pulls UnifiedTalentData (the unified_talent_data view) and the employee dimension and builds the arrays.
+    unified_df = pd.read_sql_query("SELECT * FROM unified_talent_data", conn)
+    employees_df = pd.read_sql_query(EMPLOYEES_SQL, conn)
+    return TalentArrays(unified_df, employees_df)
+
+
+# --- Equivalence Harness ---
+
+def compare_results(sql_df, engine_df, atol=0.01):
+    # Lines up the SQL and in-memory outputs row by row and returns every disagreement
+    # (an empty DataFrame means the engines are interchangeable for this benchmark set).
+    # Rates are compared with `atol` since both sides round to 2 decimals from slightly different floats.
+    key = ['employee_id', 'tgv_name', 'tv_name']
+
+    def _prepare(df):
+        df = df.sort_values(key + ['user_score'], na_position='last').reset_index(drop=True)
+        df['_n'] = df.groupby(key).cumcount()
+        return df
+
+    merged = pd.merge(_prepare(sql_df), _prepare(engine_df), on=key + ['_n'], how='outer',
+                      suffixes=('_sql', '_engine'), indicator=True)
+    problems = []
+    for side in ('left_only', 'right_only'):
+        for _, row in merged[merged['_merge'] == side].iterrows():
+            problems.append({**{k: row[k] for k in key}, 'column': '<row>',
+                             'sql': 'present' if side == 'left_only' else 'missing',
+                             'engine': 'present' if side == 'right_only' else 'missing'})
+
+    both = merged[merged['_merge'] == 'both']
+    for col in RESULT_COLUMNS:
+        if col in key:
+            continue
+        left, right = both[f'{col}_sql'], both[f'{col}_engine']
+        if col.endswith('_match_rate'):
+            diff = ~np.isclose(pd.to_numeric(left).astype(float), pd.to_numeric(right).astype(float), atol=atol + 1e-9, rtol=0)
+        else:
+            left_num = pd.to_numeric(left, errors='coerce')
+            right_num = pd.to_numeric(right, errors='coerce')
+            numeric = left_num.notna() & right_num.notna()
+            same_text = (left.astype(object).where(left.notna(), None) == right.astype(object).where(right.notna(), None)) \
+                | (left.isna() & right.isna())
+            same_num = numeric & np.isclose(left_num.fillna(0).astype(float), right_num.fillna(0).astype(float), atol=1e-6, rtol=0)
+            diff = ~(same_text | same_num)
+        for _, row in both[diff].iterrows():
+            problems.append({**{k: row[k] for k in key}, 'column': col, 'sql': row[f'{col}_sql'], 'engine': row[f'{col}_engine']})
+    return pd.DataFrame(problems, columns=key + ['column', 'sql', 'engine'])
+
+
+if __name__ == "__main__":
+    # Usage: python matching_engine.py EMP1,EMP2,...
+    # Runs query.sql and the in-memory engine for the same benchmark set using the credentials in
+    # .streamlit/secrets.toml, then reports timings and any rows where the two disagree.
+    from db import connect_from_secrets
+
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python matching_engine.py EMP1,EMP2,...")
+    benchmark_ids = tuple(s.strip() for s in sys.argv[1].split(',') if s.strip())
+    conn = connect_from_secrets()
+    try:
+        with open('query.sql', 'r') as f:
+            sql_query = f.read()
+        start = time.perf_counter()
+        sql_df = pd.read_sql_query(sql_query, conn, params=(benchmark_ids,))
+        sql_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        arrays = load_talent_arrays(conn)
+        load_seconds = time.perf_counter() - start
+    finally:
+        conn.close()
+    start = time.perf_counter()
+    engine_df = arrays.score(benchmark_ids)
+    score_seconds = time.perf_counter() - start
+
+    print(f"query.sql:        {len(sql_df):>9} rows in {sql_seconds * 1000:9.1f} ms")
+    print(f"engine (load):    {'':>9}      in {load_seconds * 1000:9.1f} ms")
+    print(f"engine (score):   {len(engine_df):>9} rows in {score_seconds * 1000:9.1f} ms")
+    problems = compare_results(sql_df, engine_df)
+    if problems.empty:
+        print("OK: both engines return identical results.")
+    else:
+        print(f"MISMATCH: {len(problems)} differences")
+        print(problems.head(50).to_string(index=False))
+        sys.exit(1)
@@ -0,0 +1,150 @@
+import json
+import math
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter, OrderedDict
+
+
+# --- Similar Job Profile Lookup ---
+# The LLM cache only matches byte-identical prompts, so "Data Analyst" and "data analyst " or a lightly
+# reworded role purpose would each cost a Gemini call. ProfileIndex keeps the normalized inputs of every
+# generated job profile with the LLM cache key of its text, and finds the most similar earlier request,
+# entirely locally: the role name and job level must match exactly after normalization, and the role
+# purpose is scored by TF-IDF cosine similarity over character trigrams. The texts themselves stay in
+# the LLM cache (and expire with it).
+# Entries are appended to a JSON-lines file; other processes pick up new lines on their next lookup.
+
+def normalize_text(text):
+    text = unicodedata.normalize('NFKC', text or '').lower()
+    return ' '.join(re.findall(r"\w+", text))
+
+
+def _terms(text):
+    # Character trigrams of each word, so "build"/"builds" or "analyst"/"analysts" still mostly overlap.
+    terms = Counter()
+    for word in text.split():
+        padded = f" {word} "
+        terms.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return terms
+
+
+class _Entry:
+    # One stored profile. `vector`/`norm` are its TF-IDF weights for the IDF of `generation`.
+    def __init__(self, terms, cache_key):
+        self.terms = terms
+        self.cache_key = cache_key
+        self.vector = None
+        self.norm = 0.0
+        self.generation = -1
+
+
+class ProfileIndex:
+    def __init__(self, path=None, threshold=0.85, max_entries=5000):
+        # `threshold` is the minimum cosine similarity (0-1) of the role purposes for a hit; `path` None
+        # keeps it in memory. Past `max_entries` the oldest entries are dropped from memory.
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        # (model, level, role, purpose) -> _Entry, oldest first; and the same entries per (model, level, role).
+        self._entries = OrderedDict()
+        self._groups = {}
+        self._doc_freq = Counter()
+        # Bumped whenever the document frequencies change, which invalidates the cached entry vectors.
+        self._generation = 0
+        self._offset = 0
+        self._lock = threading.Lock()
+
+    def _load_new(self):
+        # Reads entries appended to the file since the last call (by this or another process).
+        if self.path is None or not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb') as f:
+            f.seek(self._offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                self._offset += len(line)
+                try:
+                    entry = json.loads(line.decode('utf-8'))
+                except ValueError:
+                    continue
+                self._insert((entry['model'], entry['level'], entry['role'], entry['purpose']), entry['cache_key'])
+
+    def _insert(self, key, cache_key):
+        if key in self._entries:
+            return False
+        while len(self._entries) >= self.max_entries:
+            self._evict()
+        entry = _Entry(_terms(key[3]), cache_key)
+        self._entries[key] = entry
+        self._groups.setdefault(key[:3], {})[key[3]] = entry
+        self._doc_freq.update(entry.terms.keys())
+        self._generation += 1
+        return True
+
+    def _evict(self):
+        key, entry = self._entries.popitem(last=False)
+        group = self._groups[key[:3]]
+        del group[key[3]]
+        if not group:
+            del self._groups[key[:3]]
+        for term in entry.terms:
+            self._doc_freq[term] -= 1
+            if self._doc_freq[term] <= 0:
+                del self._doc_freq[term]
+        self._generation += 1
+
+    def _vector(self, terms):
+        n = len(self._entries)
+        vector = {term: count * (math.log((1 + n) / (1 + self._doc_freq[term])) + 1) for term, count in terms.items()}
+        norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+        return vector, norm
+
+    def _entry_vector(self, entry):
+        if entry.generation != self._generation:
+            entry.vector, entry.norm = self._vector(entry.terms)
+            entry.generation = self._generation
+        return entry.vector, entry.norm
+
+    def find(self, model_name, role_name, job_level, role_purpose):
+        # Returns (cache_key, similarity) of the earlier profile for the same role and level whose purpose
+        # is most similar, at or above the threshold, or None.
+        group_key = (model_name, normalize_text(job_level), normalize_text(role_name))
+        purpose = normalize_text(role_purpose)
+        with self._lock:
+            self._load_new()
+            group = self._groups.get(group_key)
+            if not group:
+                return None
+            if purpose in group:
+                return group[purpose].cache_key, 1.0
+            query, query_norm = self._vector(_terms(purpose))
+            if not query_norm:
+                return None
+            best = None
+            for entry in group.values():
+                vector, norm = self._entry_vector(entry)
+                if not norm:
+                    continue
+                similarity = sum(weight * vector.get(term, 0.0) for term, weight in query.items()) / (query_norm * norm)
+                if similarity >= self.threshold and (best is None or similarity > best[1]):
+                    best = (entry.cache_key, similarity)
+            return best
+
+    def add(self, model_name, role_name, job_level, role_purpose, cache_key):
+        key = (model_name, normalize_text(job_level), normalize_text(role_name), normalize_text(role_purpose))
+        with self._lock:
+            self._load_new()
+            if not self._insert(key, cache_key) or self.path is None:
+                return
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            line = json.dumps({'model': key[0], 'level': key[1], 'role': key[2], 'purpose': key[3], 'cache_key': cache_key}) + '\n'
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+            # Our own line doesn't need to be read back.
+            if os.path.getsize(self.path) == self._offset + len(line.encode('utf-8')):
+                self._offset += len(line.encode('utf-8'))
@@ -14,74 +14,15 @@ WITH
     ),
 
     -- Step 2: Unify All Talent Data
-    -- This CTE gathers raw data from multiple source tables (profiles_psych, papi_scores, strengths)
-    -- and transforms it into a standardized, long-format table. Each row represents a single
+    -- This CTE reads the standardized, long-format talent table. Each row represents a single
     -- Talent Variable (TV) for an employee, mapped to its corresponding Talent Group Variable (TGV).
-    UnifiedTalentData AS (
-        -- Cognitive Complexity & Problem-Solving from profiles_psych
-        SELECT employee_id, 'Cognitive Complexity & Problem-Solving' AS tgv_name, 'Overall IQ Score' AS tv_name, iq AS score_numeric, NULL AS score_categorical, 'higher_is_better' AS scoring_direction, 'profiles_psych' as source FROM profiles_psych WHERE iq IS NOT NULL
-        UNION ALL
-        SELECT employee_id, 'Cognitive Complexity & Problem-Solving' AS tgv_name, 'Overall GTQ Score' AS tv_name, gtq, NULL, 'higher_is_better', 'profiles_psych' FROM profiles_psych WHERE gtq IS NOT NULL
-        UNION ALL
-        SELECT employee_id, 'Cognitive Complexity & Problem-Solving' AS tgv_name, 'Overall TIKI Score' AS tv_name, tiki, NULL, 'higher_is_better', 'profiles_psych' FROM profiles_psych WHERE tiki IS NOT NULL
-        UNION ALL
-        -- Motivation & Drive from profiles_psych & papi_scores
-        SELECT employee_id, 'Motivation & Drive' AS tgv_name, 'Initial Performance (Pauli)' AS tv_name, pauli, NULL, 'higher_is_better', 'profiles_psych' FROM profiles_psych WHERE pauli IS NOT NULL
-        UNION ALL
-        SELECT employee_id, 'Motivation & Drive', 'Drive to complete tasks (Papi_N)', score, NULL, 'higher_is_better', 'papi_scores' FROM papi_scores WHERE scale_code = 'Papi_N'
-        UNION ALL
-        SELECT employee_id, 'Motivation & Drive', 'High effort and persistence (Papi_G)', score, NULL, 'higher_is_better', 'papi_scores' FROM papi_scores WHERE scale_code = 'Papi_G'
-        UNION ALL
-        SELECT employee_id, 'Motivation & Drive', 'Desire for achievement (Papi_A)', score, NULL, 'higher_is_better', 'papi_scores' FROM papi_scores WHERE scale_code = 'Papi_A'
-        UNION ALL
-        -- Leadership & Influence from profiles_psych & papi_scores
-        SELECT employee_id, 'Leadership & Influence', 'Directness, control (DISC D)', NULL, 'D', 'categorical', 'profiles_psych' FROM profiles_psych WHERE disc = 'D'
-        UNION ALL
-        SELECT employee_id, 'Leadership & Influence', 'Tendency to take leadership (Papi_L)', score, NULL, 'higher_is_better', 'papi_scores' FROM papi_scores WHERE scale_code = 'Papi_L'
-        UNION ALL
-        SELECT employee_id, 'Leadership & Influence', 'Desire to control others (Papi_P)', score, NULL, 'higher_is_better', 'papi_scores' FROM papi_scores WHERE scale_code = 'Papi_P'
-        UNION ALL
-        SELECT employee_id, 'Leadership & Influence', 'MBTI Extraversion', NULL, 'E', 'categorical', 'profiles_psych' FROM profiles_psych WHERE mbti LIKE 'E%%'
-        UNION ALL
-        SELECT employee_id, 'Leadership & Influence', 'MBTI Introversion', NULL, 'I', 'categorical', 'profiles_psych' FROM profiles_psych WHERE mbti LIKE 'I%%'
-        UNION ALL
-        -- Other TGVs from PAPI, DISC, MBTI
-        SELECT employee_id, 'Social Orientation & Collaboration', 'Sociability, persuasion (DISC I)', NULL, 'I', 'categorical', 'profiles_psych' FROM profiles_psych WHERE disc = 'I'
-        UNION ALL
-        SELECT employee_id, 'Adaptability & Stress Tolerance', 'Patience, cooperation (DISC S)', NULL, 'S', 'categorical', 'profiles_psych' FROM profiles_psych WHERE disc = 'S'
-        UNION ALL
-        SELECT employee_id, 'Conscientiousness & Reliability', 'Accuracy, rule orientation (DISC C)', NULL, 'C', 'categorical', 'profiles_psych' FROM profiles_psych WHERE disc = 'C'
-        UNION ALL
-        SELECT employee_id, 'Creativity & Innovation Orientation', 'MBTI Intuition', NULL, 'N', 'categorical', 'profiles_psych' FROM profiles_psych WHERE mbti LIKE '_N%%'
-        UNION ALL
-        SELECT employee_id, 'Creativity & Innovation Orientation', 'Drive for variety and novelty (Papi_Z)', score, NULL, 'lower_is_better', 'papi_scores' FROM papi_scores WHERE scale_code = 'Papi_Z'
-        UNION ALL
-        SELECT employee_id, 'Adaptability & Stress Tolerance', 'Work speed preference (Papi_T)', score, NULL, 'higher_is_better', 'papi_scores' FROM papi_scores WHERE scale_code = 'Papi_T'
-        UNION ALL
-        SELECT employee_id, 'Adaptability & Stress Tolerance', 'Emotional resilience (Papi_E)', score, NULL, 'higher_is_better', 'papi_scores' FROM papi_scores WHERE scale_code = 'Papi_E'
-        UNION ALL
-        SELECT employee_id, 'Leadership & Influence', 'Assertive and firm (Papi_K)', score, NULL, 'lower_is_better', 'papi_scores' FROM papi_scores WHERE scale_code = 'Papi_K'
-        UNION ALL
-        -- CliftonStrengths (Categorical) mapped to TGVs
-        SELECT
-            employee_id,
-            CASE
-                WHEN theme IN ('Achiever') THEN 'Motivation & Drive'
-                WHEN theme IN ('Arranger', 'Command', 'Self-Assurance', 'Developer') THEN 'Leadership & Influence'
-                WHEN theme IN ('Belief') THEN 'Cultural & Values Urgency'
-                WHEN theme IN ('Deliberative', 'Discipline') THEN 'Conscientiousness & Reliability'
-                WHEN theme IN ('Communication', 'Woo', 'Relator') THEN 'Social Orientation & Collaboration'
-                WHEN theme IN ('Adaptability') THEN 'Adaptability & Stress Tolerance'
-                WHEN theme IN ('Connectedness', 'Analytical', 'Strategic') THEN 'Cognitive Complexity & Problem-Solving'
-                WHEN theme IN ('Futuristic', 'Ideation') THEN 'Creativity & Innovation Orientation'
-                ELSE 'Other Strengths'
-            END AS tgv_name,
-            theme AS tv_name,
-            NULL,
-            theme AS score_categorical,
-            'categorical',
-            'strengths'
-        FROM strengths
+    -- The unpivot of the source tables (profiles_psych, papi_scores, strengths) is defined in
+    -- unified_talent_data.sql and materialized as the indexed view unified_talent_data
+    -- (refreshed with `python talent_data.py refresh`), so it is not recomputed on every analysis.
+    -- NOT MATERIALIZED lets the baseline step use the view's employee_id index for the benchmark rows.
+    UnifiedTalentData AS NOT MATERIALIZED (
+        SELECT employee_id, tgv_name, tv_name, score_numeric, score_categorical, scoring_direction, source, tv_rank
+        FROM unified_talent_data
     ),
 
     -- Step 3: Calculate the Benchmark Baseline
@@ -109,6 +50,7 @@ WITH
             utd.tgv_name,
             utd.tv_name,
             utd.source,
+            utd.tv_rank,
             COALESCE(bb.baseline_score_numeric::TEXT, bb.baseline_score_categorical) AS baseline_score,
             COALESCE(utd.score_numeric::TEXT, utd.score_categorical) AS user_score,
             CASE
@@ -141,7 +83,7 @@ WITH
 -- The results are ordered by the final_match_rate to surface the top candidates.
 SELECT
     e.employee_id, e.fullname, ddir.name AS directorate, dpos.name AS role, dgra.name AS grade,
-    tvm.tgv_name, tvm.tv_name, tvm.source, tvm.baseline_score, tvm.user_score,
+    tvm.tgv_name, tvm.tv_name, tvm.source, tvm.tv_rank, tvm.baseline_score, tvm.user_score,
     ROUND(CAST(tvm.tv_match_rate AS numeric), 2) AS tv_match_rate,
     ROUND(CAST(tgvm.tgv_match_rate AS numeric), 2) AS tgv_match_rate,
     ROUND(CAST(fm.final_match_rate AS numeric), 2) AS final_match_rate
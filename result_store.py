@@ -0,0 +1,74 @@
+import os
+import threading
+import uuid
+
+import pandas as pd
+
+
+# --- Persistent Result Store ---
+# Disk-backed cache of matching results, written as Parquet files named after the canonical
+# benchmark key and the data-version token. Unlike st.cache_data it survives restarts and is shared
+# by every app process on the host. Total size is bounded; the least recently used files are evicted.
+
+class ResultStore:
+    def __init__(self, directory, max_bytes=512 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, namespace, bench_key, data_version):
+        return os.path.join(self.directory, f"{namespace}-{data_version}-{bench_key}.parquet")
+
+    def get(self, namespace, bench_key, data_version):
+        # Returns the stored DataFrame, or None on a miss (or an unreadable file, which is dropped).
+        path = self._path(namespace, bench_key, data_version)
+        try:
+            df = pd.read_parquet(path)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            self._remove(path)
+            return None
+        # Reads bump the modification time, which is what LRU eviction orders by.
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return df
+
+    def put(self, namespace, bench_key, data_version, df):
+        # Writes to a temp file first and renames it into place, so concurrent readers in other
+        # processes never see a half-written file.
+        path = self._path(namespace, bench_key, data_version)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            df.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, path)
+        finally:
+            self._remove(tmp_path)
+        self._evict()
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _evict(self):
+        # Deletes least recently used files until the store fits in max_bytes.
+        with self._lock:
+            entries = []
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith('.parquet'):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                self._remove(path)
+                total -= size
@@ -0,0 +1,66 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+# --- Background Summary Prefetch ---
+# Generates candidate summaries ahead of time on a bounded thread pool. Results go into the shared
+# response cache, so opening a prefetched candidate in the dashboard is instant. A key is generated at
+# most once at a time: page requests for a key that is still in flight wait for that job instead of
+# sending a second request. Failed jobs are not cached; the page simply retries them. A job may produce
+# several texts at once (batched summaries); each is cached under its own key.
+
+class SummaryPrefetcher:
+    def __init__(self, cache, max_workers=4, max_pending=32):
+        # `max_workers` bounds concurrent LLM calls; `max_pending` bounds queued texts across all
+        # sessions, beyond which new prefetch requests are dropped.
+        self.cache = cache
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='summary-prefetch')
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def _run(self, keys, generate):
+        # generate() returns {key: text}; whatever it returns is cached, keys it left out are not.
+        try:
+            texts = generate()
+            for key, text in texts.items():
+                self.cache.set(key, text)
+            return texts
+        finally:
+            with self._lock:
+                for key in keys:
+                    self._in_flight.pop(key, None)
+
+    def submit(self, key, generate):
+        # Schedules generate() in the background unless the key is cached, already running, or the queue
+        # is full. Returns True if a job was scheduled.
+        return self.submit_batch([key], lambda: {key: generate()})
+
+    def submit_batch(self, keys, generate):
+        # Schedules one job producing several texts at once: generate() returns {key: text}. Nothing is
+        # scheduled if any key is already running or the queue is full, and keys that are already cached
+        # should be left out by the caller. Returns True if the job was scheduled.
+        keys = [key for key in keys if not self.cache.contains(key)]
+        if not keys:
+            return False
+        with self._lock:
+            if any(key in self._in_flight for key in keys) or len(self._in_flight) + len(keys) > self.max_pending:
+                return False
+            future = self._executor.submit(self._run, keys, generate)
+            for key in keys:
+                self._in_flight[key] = future
+        return True
+
+    def peek(self, key):
+        # Cached text, else the result of the in-flight job for the key (waiting for it), else None.
+        text = self.cache.get(key)
+        if text is not None:
+            return text
+        with self._lock:
+            future = self._in_flight.get(key)
+        if future is not None:
+            try:
+                return future.result().get(key)
+            except Exception:
+                pass
+        return None
@@ -0,0 +1,152 @@
+import hashlib
+import sys
+
+import psycopg2.errors
+
+from db import connect_from_secrets, table_change_counters
+
+
+# --- Materialized Talent Data ---
+# UnifiedTalentData (unified_talent_data.sql) is kept as an indexed materialized view so analyses only
+# pay for the baseline and match computation. It is refreshed by `python talent_data.py refresh`, which
+# only does the work when the psychometric, PAPI or strengths tables changed since the last refresh.
+# Each refresh bumps a version number in talent_data_version; persistent caches key on it.
+# Refreshes run CONCURRENTLY (analyses keep reading the old rows meanwhile), which needs the unique
+# index on one row per employee x source x TV; without it they fall back to the blocking refresh.
+
+UNIFIED_VIEW = 'unified_talent_data'
+# Tables behind the materialized view, and tables query.sql still reads directly.
+VIEW_SOURCE_TABLES = ('profiles_psych', 'papi_scores', 'strengths')
+DIRECT_TABLES = ('employees', 'dim_directorates', 'dim_positions', 'dim_grades')
+UNIQUE_KEY_INDEX = f'{UNIFIED_VIEW}_key_idx'
+# Files that define what a stored result contains: the SQL, the NumPy engine, and the queries and fetch
+# code that shape the relations.
+RESULT_FILES = ('query.sql', 'unified_talent_data.sql', 'matching_engine.py', 'talent_queries.py', 'db.py')
+
+
+def _file_hash(*paths):
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+def _create_view(cur):
+    with open('unified_talent_data.sql', 'r') as f:
+        definition = f.read().strip().rstrip(';')
+    cur.execute(f"CREATE MATERIALIZED VIEW {UNIFIED_VIEW} AS\n{definition}\n")
+    cur.execute(f"CREATE INDEX {UNIFIED_VIEW}_tv_idx ON {UNIFIED_VIEW} (tgv_name, tv_name, employee_id)")
+    cur.execute(f"CREATE INDEX {UNIFIED_VIEW}_employee_idx ON {UNIFIED_VIEW} (employee_id)")
+    # Skipped when the source tables hold duplicate rows (e.g. a PAPI scale loaded twice).
+    cur.execute("SAVEPOINT unified_key")
+    try:
+        cur.execute(f"CREATE UNIQUE INDEX {UNIQUE_KEY_INDEX} ON {UNIFIED_VIEW} (employee_id, source, tgv_name, tv_name)")
+    except psycopg2.errors.UniqueViolation:
+        cur.execute("ROLLBACK TO SAVEPOINT unified_key")
+    else:
+        cur.execute("RELEASE SAVEPOINT unified_key")
+
+
+def _refresh_view(cur):
+    # Returns False when the view has to be rebuilt instead (new duplicate rows violate the unique index).
+    cur.execute("SELECT to_regclass(%s) IS NOT NULL", (UNIQUE_KEY_INDEX,))
+    if not cur.fetchone()[0]:
+        cur.execute(f"REFRESH MATERIALIZED VIEW {UNIFIED_VIEW}")
+        return True
+    cur.execute("SAVEPOINT unified_refresh")
+    try:
+        cur.execute(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {UNIFIED_VIEW}")
+    except (psycopg2.errors.UniqueViolation, psycopg2.errors.CardinalityViolation):
+        cur.execute("ROLLBACK TO SAVEPOINT unified_refresh")
+        return False
+    cur.execute("RELEASE SAVEPOINT unified_refresh")
+    return True
+
+
+def refresh_unified_talent_data(conn, force=False):
+    # Creates the view on first use, recreates it when unified_talent_data.sql changed, and refreshes it
+    # when the source tables changed (or `force`). Returns (refreshed, version).
+    # Runs in the caller's transaction; an advisory lock keeps concurrent app processes from racing.
+    definition_hash = _file_hash('unified_talent_data.sql')
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (UNIFIED_VIEW,))
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS talent_data_version (
+                id boolean PRIMARY KEY DEFAULT true CHECK (id),
+                version bigint NOT NULL,
+                definition_hash text NOT NULL,
+                source_signature text NOT NULL,
+                refreshed_at timestamptz NOT NULL DEFAULT now()
+            )
+        """)
+        cur.execute("SELECT version, definition_hash, source_signature FROM talent_data_version")
+        stamp = cur.fetchone()
+        source_signature = table_change_counters(conn, VIEW_SOURCE_TABLES)
+        cur.execute("SELECT to_regclass(%s) IS NOT NULL", (UNIFIED_VIEW,))
+        view_exists = cur.fetchone()[0]
+
+        if view_exists and stamp and stamp[1] == definition_hash:
+            if not force and stamp[2] == source_signature:
+                return False, stamp[0]
+            refreshed = _refresh_view(cur)
+        else:
+            refreshed = False
+        if not refreshed:
+            cur.execute(f"DROP MATERIALIZED VIEW IF EXISTS {UNIFIED_VIEW}")
+            _create_view(cur)
+        cur.execute(f"ANALYZE {UNIFIED_VIEW}")
+        cur.execute(
+            """
+            INSERT INTO talent_data_version (id, version, definition_hash, source_signature, refreshed_at)
+            VALUES (true, 1, %s, %s, now())
+            ON CONFLICT (id) DO UPDATE SET version = talent_data_version.version + 1,
+                definition_hash = EXCLUDED.definition_hash,
+                source_signature = EXCLUDED.source_signature,
+                refreshed_at = EXCLUDED.refreshed_at
+            RETURNING version
+            """,
+            (definition_hash, source_signature)
+        )
+        return True, cur.fetchone()[0]
+
+
+def ensure_unified_talent_data(conn):
+    # Makes sure the view exists and matches unified_talent_data.sql, without refreshing stale data
+    # (that is left to the refresh command, so user requests never wait on a full rebuild).
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass(%s) IS NOT NULL, to_regclass('talent_data_version') IS NOT NULL", (UNIFIED_VIEW,))
+        view_exists, stamp_exists = cur.fetchone()
+        definition_hash = None
+        if stamp_exists:
+            cur.execute("SELECT definition_hash FROM talent_data_version")
+            row = cur.fetchone()
+            definition_hash = row[0] if row else None
+    if not (view_exists and definition_hash == _file_hash('unified_talent_data.sql')):
+        refresh_unified_talent_data(conn, force=True)
+
+
+# --- Data Version ---
+# A token that changes whenever the matching results may change: a refresh of the view, a write to the
+# tables query.sql reads directly, or an edit to RESULT_FILES. Persistent caches include it in their keys.
+
+def get_data_version(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT version FROM talent_data_version")
+        row = cur.fetchone()
+    token = f"{row[0] if row else 0}|{table_change_counters(conn, DIRECT_TABLES)}|{_file_hash(*RESULT_FILES)}"
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()[:12]
+
+
+if __name__ == "__main__":
+    # Usage: python talent_data.py refresh [--force]
+    # Meant to run from cron / after data loads; it is a no-op when nothing changed.
+    if len(sys.argv) < 2 or sys.argv[1] != 'refresh':
+        sys.exit("Usage: python talent_data.py refresh [--force]")
+    conn = connect_from_secrets()
+    try:
+        refreshed, version = refresh_unified_talent_data(conn, force='--force' in sys.argv[2:])
+        conn.commit()
+    finally:
+        conn.close()
+    print(f"{UNIFIED_VIEW}: {'refreshed' if refreshed else 'up to date'} (version {version})")
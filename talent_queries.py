@@ -0,0 +1,97 @@
+from db import fetch_frame
+from matching_engine import EMPLOYEES_SQL
+
+
+# --- Talent Matching Queries ---
+# Database-side entry points around query.sql. Results are fetched through db.fetch_frame with the
+# column types below (labels as Categoricals, rates as float64).
+
+TALENT_COLUMN_TYPES = {
+    'employee_id': 'string', 'fullname': 'string',
+    'directorate': 'category', 'role': 'category', 'grade': 'category',
+    'tgv_name': 'category', 'tv_name': 'category', 'source': 'category', 'tv_rank': 'float64',
+    'baseline_score': 'category', 'user_score': 'category',
+    'tv_match_rate': 'float64', 'tgv_match_rate': 'float64', 'final_match_rate': 'float64',
+}
+
+UNIFIED_COLUMN_TYPES = {
+    'employee_id': 'string', 'tgv_name': 'category', 'tv_name': 'category', 'score_numeric': 'float64',
+    'score_categorical': 'category', 'scoring_direction': 'category', 'source': 'category', 'tv_rank': 'float64',
+}
+
+RANKED_LIST_COLUMNS = ['employee_id', 'fullname', 'directorate', 'role', 'grade', 'final_match_rate', 'top_tgv', 'top_strengths']
+
+# The three normalized relations: one row per employee, per employee x TGV and per employee x TV.
+TALENT_TABLES = {
+    'employees': ['employee_id', 'fullname', 'directorate', 'role', 'grade', 'final_match_rate'],
+    'tgv': ['employee_id', 'tgv_name', 'tgv_match_rate'],
+    'tv': ['employee_id', 'tgv_name', 'tv_name', 'source', 'tv_rank', 'baseline_score', 'user_score', 'tv_match_rate'],
+}
+
+
+def load_sql(path):
+    # Reads a SQL file and drops the trailing semicolon so it can be embedded in a larger statement.
+    with open(path, 'r') as f:
+        return f.read().strip().rstrip(';')
+
+
+def column_types(columns):
+    return {col: TALENT_COLUMN_TYPES[col] for col in columns if col in TALENT_COLUMN_TYPES}
+
+
+def fetch_talent_tables(conn, benchmark_ids):
+    # Runs query.sql once into a transaction-scoped temp table and ships it back as the three compact
+    # TALENT_TABLES relations, so names, dimensions and TGV/final rates cross the wire once per
+    # employee (or employee x TGV) instead of once per TV row.
+    with conn.cursor() as cur:
+        cur.execute(f"CREATE TEMP TABLE talent_match ON COMMIT DROP AS\n{load_sql('query.sql')}\n", (tuple(benchmark_ids),))
+    tables = {}
+    for name, columns in TALENT_TABLES.items():
+        distinct = 'DISTINCT ' if name != 'tv' else ''
+        sql = f"SELECT {distinct}{', '.join(columns)} FROM talent_match"
+        tables[name] = fetch_frame(conn, sql, column_types=column_types(columns))
+    return tables
+
+
+def fetch_ranked_list(conn, benchmark_ids):
+    # Builds the ranked talent list server-side: one row per employee with their highest TGV
+    # (ROW_NUMBER over TGV rates) and first three strengths (string_agg), best match first.
+    # Strengths follow the employee's own CliftonStrengths rank, same as the Python build.
+    sql = f"""
+        WITH talent_match AS (
+            {load_sql('query.sql')}
+        ),
+        ranked_tgv AS (
+            SELECT employee_id, tgv_name,
+                   ROW_NUMBER() OVER (PARTITION BY employee_id ORDER BY tgv_match_rate DESC, tgv_name) AS rn
+            FROM (SELECT DISTINCT employee_id, tgv_name, tgv_match_rate FROM talent_match) t
+        ),
+        ranked_strengths AS (
+            SELECT employee_id, tv_name,
+                   ROW_NUMBER() OVER (PARTITION BY employee_id ORDER BY tv_rank, tv_name) AS rn
+            FROM talent_match
+            WHERE source = 'strengths'
+        )
+        SELECT e.employee_id, e.fullname, e.directorate, e.role, e.grade, e.final_match_rate,
+               t.tgv_name AS top_tgv, s.top_strengths
+        FROM (SELECT DISTINCT employee_id, fullname, directorate, role, grade, final_match_rate FROM talent_match) e
+        LEFT JOIN ranked_tgv t ON t.employee_id = e.employee_id AND t.rn = 1
+        LEFT JOIN (
+            SELECT employee_id, string_agg(tv_name, ', ' ORDER BY rn) AS top_strengths
+            FROM ranked_strengths
+            WHERE rn <= 3
+            GROUP BY employee_id
+        ) s ON s.employee_id = e.employee_id
+        ORDER BY e.final_match_rate DESC
+    """
+    types = {**column_types(RANKED_LIST_COLUMNS), 'top_tgv': 'category', 'top_strengths': 'string'}
+    return fetch_frame(conn, sql, (tuple(benchmark_ids),), types)
+
+
+def fetch_unified_rows(conn, employee_ids):
+    # UnifiedTalentData and the employee dimension for a handful of employees (an index lookup on the
+    # unified_talent_data view). Returns (unified_df, employees_df), the inputs of matching_engine.TalentArrays.
+    params = (tuple(employee_ids),)
+    unified_df = fetch_frame(conn, "SELECT * FROM unified_talent_data WHERE employee_id IN %s", params, UNIFIED_COLUMN_TYPES)
+    employees_df = fetch_frame(conn, f"SELECT * FROM ({EMPLOYEES_SQL}) e WHERE e.employee_id IN %s", params, column_types(TALENT_TABLES['employees']))
+    return unified_df, employees_df
@@ -0,0 +1,66 @@
+-- UNIFIED TALENT DATA
+-- Definition of the materialized view unified_talent_data (created and refreshed by talent_data.py),
+-- read by query.sql as UnifiedTalentData. Every source table is scanned once and unpivoted into one
+-- long-format row per employee x Talent Variable (TV). tv_rank is the employee's own rank of a
+-- CliftonStrengths theme (1 = strongest); NULL for the other sources.
+
+-- profiles_psych: one pass, unpivoted with a lateral VALUES list.
+-- The last column of each row is the condition under which the TV exists for the employee.
+SELECT pp.employee_id, v.tgv_name, v.tv_name, v.score_numeric, v.score_categorical, v.scoring_direction, 'profiles_psych' AS source,
+       NULL::integer AS tv_rank
+FROM profiles_psych pp
+CROSS JOIN LATERAL (VALUES
+    -- Cognitive Complexity & Problem-Solving
+    ('Cognitive Complexity & Problem-Solving', 'Overall IQ Score', pp.iq, NULL, 'higher_is_better', pp.iq IS NOT NULL),
+    ('Cognitive Complexity & Problem-Solving', 'Overall GTQ Score', pp.gtq, NULL, 'higher_is_better', pp.gtq IS NOT NULL),
+    ('Cognitive Complexity & Problem-Solving', 'Overall TIKI Score', pp.tiki, NULL, 'higher_is_better', pp.tiki IS NOT NULL),
+    -- Motivation & Drive
+    ('Motivation & Drive', 'Initial Performance (Pauli)', pp.pauli, NULL, 'higher_is_better', pp.pauli IS NOT NULL),
+    -- Leadership & Influence
+    ('Leadership & Influence', 'Directness, control (DISC D)', NULL, 'D', 'categorical', pp.disc = 'D'),
+    ('Leadership & Influence', 'MBTI Extraversion', NULL, 'E', 'categorical', pp.mbti LIKE 'E%'),
+    ('Leadership & Influence', 'MBTI Introversion', NULL, 'I', 'categorical', pp.mbti LIKE 'I%'),
+    -- Other TGVs from DISC, MBTI
+    ('Social Orientation & Collaboration', 'Sociability, persuasion (DISC I)', NULL, 'I', 'categorical', pp.disc = 'I'),
+    ('Adaptability & Stress Tolerance', 'Patience, cooperation (DISC S)', NULL, 'S', 'categorical', pp.disc = 'S'),
+    ('Conscientiousness & Reliability', 'Accuracy, rule orientation (DISC C)', NULL, 'C', 'categorical', pp.disc = 'C'),
+    ('Creativity & Innovation Orientation', 'MBTI Intuition', NULL, 'N', 'categorical', pp.mbti LIKE '_N%')
+) AS v(tgv_name, tv_name, score_numeric, score_categorical, scoring_direction, is_present)
+WHERE v.is_present
+UNION ALL
+-- papi_scores: one pass, each scale_code mapped to its TV through a small lookup list.
+SELECT ps.employee_id, m.tgv_name, m.tv_name, ps.score, NULL, m.scoring_direction, 'papi_scores', NULL
+FROM papi_scores ps
+JOIN (VALUES
+    ('Papi_N', 'Motivation & Drive', 'Drive to complete tasks (Papi_N)', 'higher_is_better'),
+    ('Papi_G', 'Motivation & Drive', 'High effort and persistence (Papi_G)', 'higher_is_better'),
+    ('Papi_A', 'Motivation & Drive', 'Desire for achievement (Papi_A)', 'higher_is_better'),
+    ('Papi_L', 'Leadership & Influence', 'Tendency to take leadership (Papi_L)', 'higher_is_better'),
+    ('Papi_P', 'Leadership & Influence', 'Desire to control others (Papi_P)', 'higher_is_better'),
+    ('Papi_K', 'Leadership & Influence', 'Assertive and firm (Papi_K)', 'lower_is_better'),
+    ('Papi_Z', 'Creativity & Innovation Orientation', 'Drive for variety and novelty (Papi_Z)', 'lower_is_better'),
+    ('Papi_T', 'Adaptability & Stress Tolerance', 'Work speed preference (Papi_T)', 'higher_is_better'),
+    ('Papi_E', 'Adaptability & Stress Tolerance', 'Emotional resilience (Papi_E)', 'higher_is_better')
+) AS m(scale_code, tgv_name, tv_name, scoring_direction) ON ps.scale_code = m.scale_code
+UNION ALL
+-- CliftonStrengths (Categorical) mapped to TGVs
+SELECT
+    employee_id,
+    CASE
+        WHEN theme IN ('Achiever') THEN 'Motivation & Drive'
+        WHEN theme IN ('Arranger', 'Command', 'Self-Assurance', 'Developer') THEN 'Leadership & Influence'
+        WHEN theme IN ('Belief') THEN 'Cultural & Values Urgency'
+        WHEN theme IN ('Deliberative', 'Discipline') THEN 'Conscientiousness & Reliability'
+        WHEN theme IN ('Communication', 'Woo', 'Relator') THEN 'Social Orientation & Collaboration'
+        WHEN theme IN ('Adaptability') THEN 'Adaptability & Stress Tolerance'
+        WHEN theme IN ('Connectedness', 'Analytical', 'Strategic') THEN 'Cognitive Complexity & Problem-Solving'
+        WHEN theme IN ('Futuristic', 'Ideation') THEN 'Creativity & Innovation Orientation'
+        ELSE 'Other Strengths'
+    END AS tgv_name,
+    theme AS tv_name,
+    NULL,
+    theme AS score_categorical,
+    'categorical',
+    'strengths',
+    rank
+FROM strengths;